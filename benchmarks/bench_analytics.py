@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+#Micro-benchmark of keyword_summary. It compares the old per-keyword loop of menu options 2 and 6 (a pivot of
+#months x keywords, then one boolean mask against the maximum and one append per keyword) with the vectorized
+#keyword_summary in gtrends/analytics.py on synthetic monthly trends:
+#
+#    python benchmarks/bench_analytics.py --keywords 1000 10000 100000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from gtrends.analytics import keyword_summary
+
+
+#the old implementation, with pd.concat in place of DataFrame.append which no longer exists in pandas. A keyword
+#with a tie on its peak gets one row per tied month
+def peak_months_loop(df):
+    all_kw = df.assign(month_year=df['date'].dt.strftime('%m/%y'))
+    all_kw_gb = all_kw.pivot_table(index='month_year', columns='keyword', values='value', aggfunc='sum')
+    total_df = pd.DataFrame()
+    for col in list(all_kw_gb.columns):
+        sub_df = all_kw_gb[all_kw_gb[col] == all_kw_gb[col].max()][[col]]
+        sub_df = sub_df.reset_index()
+        sub_df['keyword'] = col
+        sub_df.rename(columns={col: 'val'}, inplace=True)
+        total_df = pd.concat([total_df, sub_df])
+    return total_df.drop('val', axis=1)
+
+
+#create monthly trends like the output of monthly_trends: one row per (keyword, month) of one year
+def make_monthly(keywords, months=12):
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2020-01-01', periods=months, freq='MS')
+    return pd.DataFrame({
+        'keyword': np.repeat(['keyword {}'.format(i) for i in range(keywords)], months),
+        'date': np.tile(dates, keywords),
+        'value': rng.integers(0, 101, size=keywords * months),
+    })
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the loop and vectorized peak month computation')
+    parser.add_argument('--keywords', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--loop-limit', type=int, default=2000,
+                        help='skip the quadratic loop above this number of keywords')
+    args = parser.parse_args()
+
+    print('{:>9} {:>10} {:>12} {:>12}'.format('keywords', 'rows', 'loop (s)', 'vector (s)'))
+    for keywords in args.keywords:
+        df = make_monthly(keywords)
+        vector_time, result = timed(keyword_summary, df)
+        loop_time = float('nan')
+        if keywords <= args.loop_limit:
+            loop_time, expected = timed(peak_months_loop, df)
+            #the earliest tied month of every keyword is the one keyword_summary returns
+            expected = expected.drop_duplicates('keyword').set_index('keyword')['month_year']
+            got = result.set_index('keyword')['month'].dt.strftime('%m/%y')
+            assert (expected.sort_index() == got.sort_index()).all()
+        print('{:>9} {:>10} {:>12.4f} {:>12.4f}'.format(keywords, len(df), loop_time, vector_time))
+
+
+if __name__ == '__main__':
+    main()
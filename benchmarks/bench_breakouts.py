@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+#Benchmark of BreakoutDetector. It loads two years of synthetic daily trends of many keywords into the detector in
+#chunks like the ones Storage.iter_points yields, then adds one more day (the incremental update of a daily run) and
+#ranks the breakouts of that day:
+#
+#    python benchmarks/bench_breakouts.py --keywords 1000 10000 100000
+
+import argparse
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from gtrends.breakouts import BreakoutDetector
+
+
+#yield the daily trends of the keywords in chunks of chunk_keywords keywords, ordered by keyword and date
+def make_chunks(keywords, dates, chunk_keywords=5000):
+    rng = np.random.default_rng(0)
+    for first in range(0, keywords, chunk_keywords):
+        count = min(chunk_keywords, keywords - first)
+        names = ['keyword {}'.format(i) for i in range(first, first + count)]
+        yield pd.DataFrame({
+            'keyword': pd.Categorical.from_codes(np.repeat(np.arange(count), len(dates)), categories=names),
+            'date': np.tile(dates, count),
+            'value': rng.integers(0, 101, size=count * len(dates)),
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the loading, the daily update and the ranking of breakouts')
+    parser.add_argument('--keywords', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--days', type=int, default=730)
+    args = parser.parse_args()
+
+    print('{:>9} {:>11} {:>9} {:>11} {:>10} {:>9}'.format('keywords', 'points', 'load (s)', 'update (s)',
+                                                          'rank (s)', 'matrix MB'))
+    for keywords in args.keywords:
+        dates = pd.date_range('2019-01-01', periods=args.days, freq='D')
+        detector = BreakoutDetector()
+        load = 0.0
+        for chunk in make_chunks(keywords, dates):
+            start = time.perf_counter()
+            detector.add(chunk)
+            load += time.perf_counter() - start
+        day = pd.DataFrame({'keyword': ['keyword {}'.format(i) for i in range(keywords)],
+                            'date': dates[-1] + pd.Timedelta(days=1),
+                            'value': np.random.default_rng(1).integers(0, 101, size=keywords)})
+        start = time.perf_counter()
+        detector.update(day)
+        update = time.perf_counter() - start
+        start = time.perf_counter()
+        detector.breakouts(50)
+        rank = time.perf_counter() - start
+        print('{:>9} {:>11} {:>9.2f} {:>11.3f} {:>10.3f} {:>9.1f}'.format(
+            keywords, keywords * (args.days + 1), load, update, rank, detector.matrix.nbytes / 2 ** 20))
+    print('peak RSS: {:.0f} MB'.format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+if __name__ == '__main__':
+    main()
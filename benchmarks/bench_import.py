@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+#Import-time benchmark of the gtrends package. Every scenario imports what one kind of run needs in a fresh
+#interpreter with python -X importtime, prints the slowest imports, and fails (exit status 1) if a scenario loads a
+#heavy dependency that belongs to another stage or takes longer than the budget, so it can guard startup time in CI:
+#
+#    python benchmarks/bench_import.py --budget-ms 800
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+#what each kind of run imports at startup, and the packages it must not load before they are needed
+SCENARIOS = {
+    'cli': ('import gtrends.cli', ['pytrends', 'requests', 'matplotlib', 'seaborn', 'duckdb']),
+    'report': ('import gtrends.pipeline, gtrends.reports',
+               ['pytrends', 'requests', 'matplotlib', 'seaborn', 'duckdb', 'psycopg2']),
+    'fetch': ('import gtrends.fetch', ['psycopg2', 'matplotlib', 'seaborn', 'duckdb']),
+}
+
+
+#run the statement in a fresh interpreter and return {module: (self_us, cumulative_us)}
+def import_times(statement):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        times[module.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure and guard the import time of gtrends')
+    parser.add_argument('--budget-ms', type=float, default=1000,
+                        help='fail if a scenario takes longer than this to import')
+    parser.add_argument('--top', type=int, default=8, help='number of slowest imports to show')
+    parser.add_argument('--repeat', type=int, default=3, help='keep the fastest of this many runs')
+    args = parser.parse_args()
+
+    failed = False
+    for name, (statement, forbidden) in SCENARIOS.items():
+        runs = [import_times(statement) for _ in range(args.repeat)]
+        times = min(runs, key=lambda t: sum(self_us for self_us, _ in t.values()))
+        total_ms = sum(self_us for self_us, _ in times.values()) / 1000
+        print('{}: {} ({:.0f} ms, {} modules)'.format(name, statement, total_ms, len(times)))
+        top_level = {module: cumulative for module, (_, cumulative) in times.items() if '.' not in module}
+        for module, cumulative in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+            print('    {:<30} {:>8.1f} ms'.format(module, cumulative / 1000))
+        loaded = [module for module in forbidden if module in times]
+        if loaded:
+            print('    FAIL: loads {} at startup'.format(', '.join(loaded)))
+            failed = True
+        if total_ms > args.budget_ms:
+            print('    FAIL: over the budget of {:.0f} ms'.format(args.budget_ms))
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
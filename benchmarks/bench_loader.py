@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+#Benchmark of the ways to load the long-format trend table (keyword, date, value, trend_type) into PostgreSQL:
+#execute_many (one INSERT per row), psycopg2.extras.execute_values (multi-row INSERT) and copy_from_df (COPY).
+#It needs a PostgreSQL server that can be reached with the given DSN, for example a local one:
+#
+#    python benchmarks/bench_loader.py --dsn "host=localhost dbname=trends user=postgres" --rows 200000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2.extras import execute_values
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from gtrends.db import execute_many, copy_from_df
+
+
+#create a synthetic long-format trend table with the same columns as the output of to_dbtable
+def make_frame(rows, keywords=1000):
+    rng = np.random.default_rng(0)
+    days = max(1, rows // keywords)
+    dates = pd.date_range('2019-01-01', periods=days, freq='D')
+    df = pd.DataFrame({
+        'keyword': np.repeat(['keyword {}'.format(i) for i in range(keywords)], days),
+        'date': np.tile(dates, keywords),
+        'value': rng.integers(0, 101, size=keywords * days),
+        'trend_type': np.repeat(['topic {}'.format(i % 7) for i in range(keywords)], days),
+    })
+    return df.iloc[:rows]
+
+
+def create_table(conn, table):
+    cur = conn.cursor()
+    cur.execute("DROP TABLE IF EXISTS {}".format(table))
+    cur.execute("""
+        CREATE TABLE {} (
+            ID SERIAL PRIMARY KEY,
+            keyword TEXT NOT NULL,
+            date DATE,
+            value INT,
+            trend_type TEXT
+        )""".format(table))
+    conn.commit()
+    cur.close()
+
+
+def load_execute_values(conn, df, table):
+    cols = ','.join(list(df.columns))
+    cur = conn.cursor()
+    execute_values(cur, "INSERT INTO {} ({}) VALUES %s".format(table, cols),
+                   df.itertuples(index=False, name=None), page_size=10000)
+    conn.commit()
+    cur.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the PostgreSQL loaders for the trend table')
+    parser.add_argument('--dsn', default=os.environ.get('TRENDS_DSN', 'dbname=postgres'))
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--skip-executemany', action='store_true',
+                        help='executemany is very slow on large frames')
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    loaders = {
+        'execute_values': load_execute_values,
+        'copy_from_df': lambda conn, df, table: copy_from_df(conn, df, table, args.chunk_size),
+    }
+    if not args.skip_executemany:
+        loaders = {'execute_many': execute_many, **loaders}
+
+    conn = psycopg2.connect(args.dsn)
+    table = 'bench_trend_load'
+    try:
+        for name, loader in loaders.items():
+            create_table(conn, table)
+            start = time.perf_counter()
+            loader(conn, df, table)
+            elapsed = time.perf_counter() - start
+            cur = conn.cursor()
+            cur.execute("SELECT count(*) FROM {}".format(table))
+            count = cur.fetchone()[0]
+            cur.close()
+            print('{:<15} {:>10} rows {:>9.3f} s {:>12.0f} rows/s'.format(name, count, elapsed, count / elapsed))
+    finally:
+        cur = conn.cursor()
+        cur.execute("DROP TABLE IF EXISTS {}".format(table))
+        conn.commit()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+#Benchmark of the whole fetch -> load -> report pipeline on synthetic data. A fake keytrends.xlsx is written, the
+#requests are answered by StubTrendReq (benchmarks/synthetic.py) instead of Google Trends, the trends are loaded into
+#a Parquet warehouse in a temporary folder (and into PostgreSQL with execute_many and COPY if a DSN is given), and
+#every stage is timed on its own with the peak of the memory it allocated (tracemalloc, which also sees NumPy
+#arrays; the charts drawn in other processes are not counted). The results are written as JSON, and with --baseline
+#the stages that got slower than a previous result by more than the tolerance make the exit status 1:
+#
+#    python benchmarks/bench_pipeline.py --keywords 65 1000 50000 --output bench_pipeline.json
+#    python benchmarks/bench_pipeline.py --keywords 65 1000 --baseline bench_pipeline.json
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from synthetic import install_stub, write_keytrends
+
+
+#time the stages of one run and keep their results. The output of the functions is hidden
+class Stages:
+    def __init__(self, trace=True):
+        self.trace = trace
+        self.results = []
+
+    def run(self, name, func, *args, **kwargs):
+        if self.trace:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        stage = {'stage': name, 'seconds': round(seconds, 4)}
+        if self.trace:
+            stage['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+            tracemalloc.stop()
+        stage['rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        if isinstance(result, pd.DataFrame):
+            stage['rows'] = len(result)
+        print('    {:<22} {:>9.3f} s {:>10} MB'.format(name, seconds, stage.get('peak_mb', '-')))
+        self.results.append(stage)
+        return result
+
+    def skip(self, name, reason):
+        print('    {:<22} skipped ({})'.format(name, reason))
+        self.results.append({'stage': name, 'skipped': reason})
+
+
+#load the long table into a new PostgreSQL table with execute_many (at most rows rows, it is slow) and COPY
+def load_postgres(stages, df, dsn, rows):
+    import psycopg2
+
+    from bench_loader import create_table
+    from gtrends.db import copy_from_df, execute_many
+
+    conn = psycopg2.connect(dsn)
+    try:
+        df = df.astype({'keyword': str, 'trend_type': str})
+        create_table(conn, 'bench_pipeline')
+        stages.run('execute_many', execute_many, conn, df.iloc[:rows], 'bench_pipeline')
+        create_table(conn, 'bench_pipeline')
+        stages.run('copy_from_df', copy_from_df, conn, df, 'bench_pipeline')
+        cur = conn.cursor()
+        cur.execute('DROP TABLE bench_pipeline')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+#draw the charts: one chart, then a batch of charts, then the same batch again from the chart cache
+def run_charts(stages, params_dic, years, output, cache_dir):
+    from gtrends.reports import chart_batch, chart_top_keywords
+
+    stages.run('chart_top_keywords', chart_top_keywords, params_dic, years[-1], os.path.join(output, 'top.png'),
+               cache_dir=cache_dir)
+    stages.run('chart_batch', chart_batch, params_dic, years, os.path.join(output, 'charts'), cache_dir=cache_dir)
+    stages.run('chart_batch_cached', chart_batch, params_dic, years, os.path.join(output, 'charts'),
+               cache_dir=cache_dir)
+
+
+#run every stage for one number of keywords in the folder workdir and return the list of stage results
+def run_pipeline(keywords, args, workdir):
+    from gtrends.catalog import get_data
+    from gtrends.series import to_dbtable
+    from gtrends.fetch import dict_trend, dict_trend_concurrent
+    from gtrends.metrics import METRICS
+    from gtrends.reports import (export_points, monthly_trends, report_breakouts, report_by_topic, report_top_by_year,
+                                 report_top_keywords, to_pivot)
+    from gtrends.storage import close_storages, get_storage
+
+    METRICS.reset()
+    stages = Stages(not args.no_trace)
+    xlsx = write_keytrends(os.path.join(workdir, 'keytrends.xlsx'), keywords, args.topics)
+    kt = stages.run('get_data', get_data, xlsx, cache_dir=None)
+    get_data(xlsx, cache_dir=os.path.join(workdir, 'catalog_cache'))
+    stages.run('get_data_cached', get_data, xlsx, cache_dir=os.path.join(workdir, 'catalog_cache'))
+
+    timeframe = args.timeframes[0]
+    dic = stages.run('dict_trend', dict_trend, kt, timeframe)
+    results, _ = stages.run('dict_trend_concurrent', dict_trend_concurrent, kt, args.timeframes,
+                            max_workers=args.workers, rate=1e9, burst=10 ** 6)
+    df = stages.run('to_dbtable', to_dbtable, dic, list(dic))
+    if args.dsn:
+        load_postgres(stages, df, args.dsn, args.executemany_rows)
+    else:
+        stages.skip('execute_many', 'no --dsn')
+
+    params_dic = {'backend': 'parquet', 'path': os.path.join(workdir, 'warehouse')}
+    storage = get_storage(params_dic)
+    with contextlib.redirect_stdout(io.StringIO()):
+        storage.setup()
+
+    def upsert_all():
+        for (geo, tf), topics in results.items():
+            storage.upsert(to_dbtable(topics, list(topics), geo), tf)
+
+    stages.run('upsert_parquet', upsert_all)
+    years = sorted({year for tf in args.timeframes for year in pd.DatetimeIndex(tf.split()[:2]).year})
+    output = os.path.join(workdir, 'out')
+    os.makedirs(output, exist_ok=True)
+    stages.run('report_top_keywords', report_top_keywords, params_dic, years, os.path.join(output, 'top.xlsx'))
+    stages.run('report_by_topic', report_by_topic, params_dic, years[-1], os.path.join(output, 'by_topic.xlsx'))
+    stages.run('report_top_by_year', report_top_by_year, params_dic, years[::-1], os.path.join(output, 'by_year.xlsx'))
+    monthly = monthly_trends(params_dic, [years[-1]])
+    stages.run('to_pivot', to_pivot, dict(tuple(monthly.groupby('trend_type', sort=False))))
+    cache_dir = os.path.join(workdir, 'chart_cache')
+    if args.no_charts:
+        stages.skip('charts', '--no-charts')
+    else:
+        run_charts(stages, params_dic, years, output, cache_dir)
+    stages.run('export_points', export_points, params_dic, years, os.path.join(output, 'points.parquet'))
+    stages.run('report_breakouts', report_breakouts, params_dic, years, os.path.join(output, 'breakouts.csv'))
+    close_storages()
+    return stages.results
+
+
+#compare the results with a previous JSON result and return the messages of the stages that are slower by more
+#than tolerance (0.25 is 25%). Stages faster than min_seconds are not compared, their times are mostly noise
+def compare(runs, baseline, tolerance, min_seconds=0.05):
+    before = {(run['keywords'], stage['stage']): stage.get('seconds') for run in baseline['runs']
+              for stage in run['stages']}
+    messages = []
+    for run in runs:
+        for stage in run['stages']:
+            old = before.get((run['keywords'], stage['stage']))
+            new = stage.get('seconds')
+            if old is None or new is None or max(old, new) < min_seconds:
+                continue
+            if new > old * (1 + tolerance):
+                messages.append('{} keywords, {}: {:.3f} s -> {:.3f} s (+{:.0f}%)'.format(
+                    run['keywords'], stage['stage'], old, new, (new / old - 1) * 100))
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time every stage of the pipeline on synthetic data')
+    parser.add_argument('--keywords', type=int, nargs='+', default=[65, 1000])
+    parser.add_argument('--topics', type=int, default=7)
+    parser.add_argument('--timeframes', nargs='+', default=['2019-01-01 2019-12-31', '2020-01-01 2020-12-31'])
+    parser.add_argument('--granularity', choices=['D', 'W-SUN', 'MS'],
+                        help='force the frequency of the points instead of the one Google would choose')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the stub waits per request')
+    parser.add_argument('--workers', type=int, default=4, help='threads of dict_trend_concurrent')
+    parser.add_argument('--dsn', default=os.environ.get('TRENDS_DSN'),
+                        help='PostgreSQL DSN for the execute_many and COPY stages, skipped without it')
+    parser.add_argument('--executemany-rows', type=int, default=20000,
+                        help='load at most this many rows with execute_many')
+    parser.add_argument('--no-trace', action='store_true',
+                        help='do not measure the memory peaks (tracemalloc slows the stages down)')
+    parser.add_argument('--no-charts', action='store_true', help='skip the chart stages, the slowest ones')
+    parser.add_argument('--output', default='bench_pipeline.json', help='JSON file of the results')
+    parser.add_argument('--baseline', help='JSON file of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='fail if a stage is slower than the baseline by more than this fraction')
+    args = parser.parse_args()
+
+    install_stub(args.latency, args.granularity)
+    runs = []
+    for keywords in args.keywords:
+        print('{} keywords in {} topics'.format(keywords, args.topics))
+        workdir = tempfile.mkdtemp(prefix='bench_pipeline_')
+        try:
+            runs.append({'keywords': keywords, 'stages': run_pipeline(keywords, args, workdir)})
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+        'platform': platform.platform(), 'cpus': os.cpu_count(),
+        'settings': {'topics': args.topics, 'timeframes': args.timeframes, 'granularity': args.granularity,
+                     'latency': args.latency, 'workers': args.workers, 'traced': not args.no_trace},
+        'runs': runs,
+    }
+    failed = False
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('settings') != result['settings']:
+            print('The baseline was run with other settings, the times may not be comparable')
+        messages = compare(runs, baseline, args.tolerance)
+        for message in messages:
+            print('SLOWER: ' + message)
+        failed = bool(messages)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print('The results are written to {}'.format(args.output))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+#Memory benchmark of SeriesStore. It compares the bytes per stored point of the dictionary of float64 dataframes
+#returned by dict_trend, of the long table returned by to_dbtable and of the SeriesStore in gtrends/series.py, for a
+#year of daily trends:
+#
+#    python benchmarks/bench_series.py --keywords 1000 10000 30000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from gtrends.series import to_dbtable
+from gtrends.series import SeriesStore
+
+
+#create a dictionary like the output of dict_trend: one wide dataframe of daily values per topic
+def make_dict(keywords, topics=7, periods=366):
+    rng = np.random.default_rng(0)
+    index = pd.date_range('2020-01-01', periods=periods, freq='D', name='date')
+    return {'topic{}'.format(t): pd.DataFrame(rng.integers(0, 101, size=(periods, len(range(t, keywords, topics))))
+                                              .astype(np.float64), index=index,
+                                              columns=['keyword {}'.format(i) for i in range(t, keywords, topics)])
+            for t in range(topics)}
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the memory used by the representations of the trends')
+    parser.add_argument('--keywords', type=int, nargs='+', default=[1000, 10000])
+    args = parser.parse_args()
+
+    print('{:>9} {:>11} {:>13} {:>13} {:>13} {:>10}'.format('keywords', 'points', 'dict (B/pt)', 'long (B/pt)',
+                                                             'store (B/pt)', 'build (s)'))
+    for keywords in args.keywords:
+        dic = make_dict(keywords)
+        points = sum(df.size for df in dic.values())
+        dict_bytes = sum(frame_bytes(df) for df in dic.values())
+        long_bytes = frame_bytes(to_dbtable(dic, list(dic)))
+        start = time.perf_counter()
+        store = SeriesStore.from_dict(dic)
+        store.build()
+        elapsed = time.perf_counter() - start
+        print('{:>9} {:>11} {:>13.2f} {:>13.2f} {:>13.2f} {:>10.3f}'.format(
+            keywords, points, dict_bytes / points, long_bytes / points, store.nbytes / points, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+#Micro-benchmark of to_dbtable. It compares the old loop, which appends every keyword to the accumulated dataframe
+#(quadratic in the number of rows), with the vectorized to_dbtable in gtrends/series.py on synthetic topic dictionaries:
+#
+#    python benchmarks/bench_to_dbtable.py --keywords 100 1000 10000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from gtrends.series import to_dbtable
+
+
+#the old implementation, with pd.concat in place of DataFrame.append which no longer exists in pandas
+def to_dbtable_loop(dic, dic_key_lst):
+    new_df = pd.DataFrame()
+    for key in dic_key_lst:
+        for col in list(dic[key].columns):
+            sub_df = dic[key][[col]].reset_index()
+            sub_df.insert(0, 'keyword', col)
+            sub_df.rename(columns={col: 'value'}, inplace=True)
+            sub_df.insert((len(sub_df.columns) - 1), 'trend_type', key)
+            new_df = pd.concat([new_df, sub_df])
+    return new_df
+
+
+#create a dictionary like the output of dict_trend: one wide dataframe of weekly values per topic
+def make_dict(keywords, topics=7, periods=52):
+    rng = np.random.default_rng(0)
+    index = pd.date_range('2019-01-06', periods=periods, freq='W', name='date')
+    dic = {}
+    for t in range(topics):
+        cols = ['keyword {}'.format(i) for i in range(t, keywords, topics)]
+        dic['topic{}'.format(t)] = pd.DataFrame(rng.integers(0, 101, size=(periods, len(cols))),
+                                                index=index, columns=cols)
+    return dic
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the loop and vectorized to_dbtable')
+    parser.add_argument('--keywords', type=int, nargs='+', default=[65, 1000, 5000])
+    parser.add_argument('--loop-limit', type=int, default=5000,
+                        help='skip the quadratic loop above this number of keywords')
+    args = parser.parse_args()
+
+    print('{:>9} {:>10} {:>12} {:>12}'.format('keywords', 'rows', 'loop (s)', 'vector (s)'))
+    for keywords in args.keywords:
+        dic = make_dict(keywords)
+        keys = list(dic.keys())
+        vector_time, result = timed(to_dbtable, dic, keys)
+        loop_time = float('nan')
+        if keywords <= args.loop_limit:
+            loop_time, expected = timed(to_dbtable_loop, dic, keys)
+            assert (expected['value'].to_numpy() == result['value'].to_numpy()).all()
+        print('{:>9} {:>10} {:>12.4f} {:>12.4f}'.format(keywords, len(result), loop_time, vector_time))
+
+
+if __name__ == '__main__':
+    main()
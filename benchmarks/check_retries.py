@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+#Check of the retries of the fetching code against a local HTTP server that speaks the Google Trends API (pytrends is
+#pointed at it with use_trends_server) and answers 429 or 503 when told to. It checks that fetch_interest retries
+#throttled and failing requests the given number of times with a jittered backoff that doubles after every attempt,
+#that it does not retry other errors, and that dict_trend_concurrent returns the topics it could fetch with the list
+#of the failed jobs. It also checks that a run answered from the cache sends nothing, not even the request of the
+#cookie that TrendReq sends when it is created, and that a failed cookie request is retried. The exit status is 1 if a
+#check fails:
+#
+#    python benchmarks/check_retries.py
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import gtrends.fetch
+from gtrends.fetch import (RateLimiter, TrendCache, TrendReq, TrendSession, dict_trend_concurrent, fetch_interest,
+                           use_trends_server)
+from gtrends.metrics import METRICS
+
+
+#a stand-in for the Google Trends API. The explore requests of a keyword list are answered with the statuses of
+#plan[first keyword] in turn, then with 200, and the keywords in blocked always get a 429. hits counts the explore
+#requests of every first keyword and cookies the requests of the cookie page, the first drop_cookies of which are
+#answered by closing the connection
+class StubHandler(BaseHTTPRequestHandler):
+    plan = {}
+    blocked = set()
+    hits = {}
+    cookies = 0
+    drop_cookies = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, body, prefix):
+        data = (prefix + json.dumps(body)).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_status(self, status):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html')
+        self.end_headers()
+
+    def do_POST(self):
+        self.do_GET()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path.endswith('/api/explore'):
+            keywords = [item['keyword'] for item in json.loads(query['req'][0])['comparisonItem']]
+            with self.lock:
+                self.hits[keywords[0]] = self.hits.get(keywords[0], 0) + 1
+                statuses = self.plan.get(keywords[0], [])
+                status = 429 if self.blocked.intersection(keywords) else statuses.pop(0) if statuses else 200
+            if status != 200:
+                return self.send_status(status)
+            self.send_json({'widgets': [{'id': 'TIMESERIES', 'request': {'kw': keywords}, 'token': 't'}]}, ")]}'")
+        elif url.path.endswith('/multiline'):
+            keywords = json.loads(query['req'][0])['kw']
+            timeline = [{'time': str(1577836800 + i * 604800),
+                         'value': [(j + 1) * 10 + i for j in range(len(keywords))]} for i in range(3)]
+            self.send_json({'default': {'timelineData': timeline}}, ")]}',")
+        else: #the page pytrends reads its cookies from
+            with self.lock:
+                StubHandler.cookies += 1
+                drop = StubHandler.drop_cookies > 0
+                StubHandler.drop_cookies -= drop
+            if drop:
+                self.close_connection = True
+                return
+            self.send_status(200)
+
+
+#start the stub server on a free port and point pytrends at it
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    use_trends_server('http://127.0.0.1:{}/trends'.format(server.server_port))
+    return server
+
+
+#record the upper bounds of the random waits of the backoff instead of waiting
+class Waits:
+    def __init__(self):
+        self.bounds = []
+        self.uniform = gtrends.fetch.random.uniform
+
+    def __enter__(self):
+        gtrends.fetch.random.uniform = lambda low, high: self.bounds.append(high) or 0.0
+        return self
+
+    def __exit__(self, *exc):
+        gtrends.fetch.random.uniform = self.uniform
+
+
+#a rate limiter that counts the tokens it gives
+class CountingLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(1e9, 100)
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+        super().acquire()
+
+
+def reset(plan=None, blocked=(), drop_cookies=0):
+    StubHandler.plan = {keyword: list(statuses) for keyword, statuses in (plan or {}).items()}
+    StubHandler.blocked = set(blocked)
+    StubHandler.hits = {}
+    StubHandler.cookies = 0
+    StubHandler.drop_cookies = drop_cookies
+    METRICS.reset()
+
+
+def check_retried():
+    reset({'music': [429, 503, 429]})
+    with Waits() as waits:
+        data = fetch_interest(TrendReq(hl='en-US', tz=420), ['music'], 'today 3-m', retries=5, backoff=0.5)
+    assert list(data.columns) == ['music', 'isPartial'] and len(data) == 3, data
+    assert StubHandler.hits == {'music': 4}, StubHandler.hits
+    assert waits.bounds == [0.5, 1.0, 2.0], waits.bounds
+    assert METRICS.total('gtrends_retries_total') == 3
+    assert METRICS.total('gtrends_throttled_total') == 2
+
+
+def check_gave_up():
+    reset(blocked=['music'])
+    with Waits() as waits:
+        try:
+            fetch_interest(TrendReq(hl='en-US', tz=420), ['music'], 'today 3-m', retries=3, backoff=0.25)
+        except gtrends.fetch.ResponseError as error:
+            assert error.response.status_code == 429
+        else:
+            raise AssertionError('a request that is always throttled did not fail')
+    assert StubHandler.hits == {'music': 4}, StubHandler.hits
+    assert waits.bounds == [0.25, 0.5, 1.0], waits.bounds
+
+
+def check_not_retried():
+    reset({'music': [404]})
+    with Waits() as waits:
+        try:
+            fetch_interest(TrendReq(hl='en-US', tz=420), ['music'], 'today 3-m', retries=3)
+        except gtrends.fetch.ResponseError as error:
+            assert error.response.status_code == 404
+        else:
+            raise AssertionError('a 404 did not fail')
+    assert StubHandler.hits == {'music': 1}, StubHandler.hits
+    assert waits.bounds == []
+
+
+def check_partial_results():
+    reset({'rock': [503, 429]}, blocked=['movie'])
+    keytrends = pd.DataFrame({'Music': ['rock', 'pop'], 'Movies': ['movie', None]})
+    with Waits():
+        results, failed = dict_trend_concurrent(keytrends, ['today 3-m'], max_workers=2, rate=1e9, burst=100)
+    topics = results['VN', 'today 3-m']
+    assert list(topics) == ['Music'], list(topics)
+    assert list(topics['Music'].columns) == ['rock', 'pop'], topics['Music']
+    assert failed == [('VN', 'Movies', 'today 3-m')], failed
+    assert StubHandler.hits == {'rock': 3, 'pop': 1, 'movie': 6}, StubHandler.hits
+    assert METRICS.total('gtrends_jobs_total', status='failed') == 1
+
+
+def check_cached_rerun():
+    keytrends = pd.DataFrame({'Music': ['rock', 'pop'], 'Movies': ['movie', None]})
+    folder = tempfile.mkdtemp()
+    try:
+        for anchor in (None, 'rock'):
+            cache = TrendCache(folder)
+            reset()
+            dict_trend_concurrent(keytrends, ['today 3-m'], anchor, max_workers=2, rate=1e9, burst=100, cache=cache)
+            assert StubHandler.cookies <= 2, StubHandler.cookies #one session per thread of the pool
+            reset()
+            results, failed = dict_trend_concurrent(keytrends, ['today 3-m'], anchor, max_workers=2, rate=1e9,
+                                                    burst=100, cache=cache)
+            assert not failed and list(results['VN', 'today 3-m']) == ['Music', 'Movies'], failed
+            assert StubHandler.cookies == 0 and StubHandler.hits == {}, (StubHandler.cookies, StubHandler.hits)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def check_cookie_retried():
+    reset(drop_cookies=1)
+    limiter = CountingLimiter()
+    with Waits() as waits:
+        data = fetch_interest(TrendSession(), ['music'], 'today 3-m', limiter, retries=3, backoff=0.5)
+    assert len(data) == 3, data
+    assert StubHandler.cookies == 2 and StubHandler.hits == {'music': 1}, (StubHandler.cookies, StubHandler.hits)
+    assert limiter.acquired == 2, limiter.acquired
+    assert waits.bounds == [0.5], waits.bounds
+
+
+CHECKS = [check_retried, check_gave_up, check_not_retried, check_partial_results, check_cached_rerun,
+          check_cookie_retried]
+
+
+def main():
+    server = start_server()
+    failures = 0
+    try:
+        for check in CHECKS:
+            try:
+                check()
+            except AssertionError as error:
+                failures += 1
+                print('FAILED {}: {}'.format(check.__name__, error))
+            else:
+                print('ok     {}'.format(check.__name__))
+    finally:
+        server.shutdown()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# coding: utf-8
+
+#Synthetic data for the benchmarks: a fake keytrends.xlsx with any number of keywords and topics, and a stand-in for
+#pytrends' TrendReq that answers every request locally with made-up but deterministic trends, so the whole pipeline
+#can be run without Google Trends. Like Google, the stub returns daily points for timeframes up to 269 days, weekly
+#points up to five years and monthly points above that, unless a granularity is forced
+
+import datetime
+import functools
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+#create a catalog like the one returned by get_data: one column per topic, the keywords dealt to the topics in turn
+def make_catalog(keywords, topics=7):
+    columns = {'Topic{}'.format(t): pd.Series(['keyword {}'.format(i) for i in range(t, keywords, topics)],
+                                              dtype=object)
+               for t in range(min(topics, keywords))}
+    return pd.DataFrame(columns)
+
+
+#write the catalog of make_catalog as an excel file that get_data can read, and return its path
+def write_keytrends(path, keywords, topics=7):
+    make_catalog(keywords, topics).to_excel(path, index=False)
+    return path
+
+
+#return the dates of the points Google Trends returns for a timeframe 'YYYY-MM-DD YYYY-MM-DD', with the given pandas
+#frequency ('D', 'W-SUN', 'MS') or the one Google would choose from the length of the timeframe. The dates of a
+#timeframe are computed once, so the stub costs little next to the code being measured
+@functools.lru_cache(maxsize=None)
+def timeframe_dates(timeframe, granularity=None):
+    try:
+        start, end = (datetime.date.fromisoformat(part) for part in timeframe.split())
+    except ValueError: #'today 5-y' and the like
+        end = datetime.date.today()
+        start = end - datetime.timedelta(days=5 * 365)
+    if granularity is None:
+        days = (end - start).days
+        granularity = 'D' if days <= 269 else 'W-SUN' if days <= 5 * 365 + 1 else 'MS'
+    dates = pd.date_range(start, end, freq=granularity, name='date')
+    return dates if len(dates) else pd.DatetimeIndex([start], name='date')
+
+
+#a stand-in for pytrends.request.TrendReq. The values of a payload are random walks seeded by the payload, scaled so
+#that the largest value of the payload is 100 like Google does. latency seconds are slept per request to mimic the
+#network. Set the class attributes granularity and latency to change them for every instance
+class StubTrendReq:
+    granularity = None
+    latency = 0.0
+
+    def __init__(self, hl='en-US', tz=360, **kwargs):
+        self.hl = hl
+        self.tz = tz
+
+    def build_payload(self, kw_list, cat=0, timeframe='today 5-y', geo='', gprop=''):
+        self.kw_list = list(kw_list)
+        self.timeframe = timeframe
+        self.geo = geo
+
+    def rng(self, *extra):
+        seed = '|'.join([self.timeframe, self.geo] + self.kw_list + list(extra))
+        return np.random.default_rng(zlib.crc32(seed.encode('utf-8')))
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def interest_over_time(self):
+        self.wait()
+        dates = timeframe_dates(self.timeframe, self.granularity)
+        walk = np.abs(self.rng().normal(size=(len(dates), len(self.kw_list))).cumsum(axis=0)) + 1
+        values = np.rint(walk * 100 / walk.max()).astype(np.int64)
+        df = pd.DataFrame(values, index=dates, columns=self.kw_list)
+        df['isPartial'] = False
+        return df
+
+    def interest_by_region(self, resolution='COUNTRY', inc_low_vol=False, inc_geo_code=False):
+        self.wait()
+        regions = ['{}-{:02d}'.format(self.geo or 'XX', i) for i in range(10)]
+        values = self.rng(resolution).integers(0, 101, size=(len(regions), len(self.kw_list)))
+        df = pd.DataFrame(values, index=pd.Index(['Region {}'.format(i) for i in range(10)], name='geoName'),
+                          columns=self.kw_list)
+        if inc_geo_code:
+            df.insert(0, 'geoCode', regions)
+        return df
+
+    def related_queries(self):
+        self.wait()
+        return {kw: {'top': pd.DataFrame({'query': ['{} {}'.format(kw, i) for i in range(5)],
+                                          'value': [100, 80, 60, 40, 20]}),
+                     'rising': pd.DataFrame({'query': ['{} new {}'.format(kw, i) for i in range(3)],
+                                             'value': [5000, 300, 120]})}
+                for kw in self.kw_list}
+
+    def related_topics(self):
+        self.wait()
+        return {kw: {'top': pd.DataFrame({'value': [100, 50], 'topic_title': [kw.title(), kw.title() + ' Topic'],
+                                          'topic_type': ['Topic', 'Topic']}),
+                     'rising': None}
+                for kw in self.kw_list}
+
+
+#make the fetching code of gtrends use StubTrendReq instead of Google Trends
+def install_stub(latency=0.0, granularity=None):
+    import gtrends.fetch
+
+    StubTrendReq.latency = latency
+    StubTrendReq.granularity = granularity
+    gtrends.fetch.TrendReq = StubTrendReq #TrendSession creates its TrendReq from here
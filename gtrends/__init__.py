@@ -0,0 +1,4 @@
+# coding: utf-8
+
+#Fetching Google Trends data for a list of keywords, saving it into PostgreSQL and reporting on it.
+#The interactive menu is final1.py, and the same work can be run from a job file with python -m gtrends job.json
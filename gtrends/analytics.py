@@ -0,0 +1,32 @@
+# coding: utf-8
+
+#Analysis of trends that are already in memory (dataframes with the columns keyword, date and value)
+
+import numpy as np
+import pandas as pd
+
+
+#this is a function that finds, for every keyword, its total number of searches, the month in which it was searched
+#the most and its rank by total, in one vectorized pass: the values are summed into a keywords x months array with
+#np.bincount and the peak month is the argmax of every row. Ties are broken the same way every time: the earliest
+#month wins a tie on the peak, and the keyword that comes first alphabetically wins a tie on the rank. If n is
+#given only the top n keywords are returned. The result has the columns keyword, total, month and rank
+def keyword_summary(df, n=None):
+    keyword_codes, keywords = pd.factorize(df['keyword'], sort=True)
+    months = pd.to_datetime(df['date']).to_numpy().astype('datetime64[M]')
+    month_codes, month_index = pd.factorize(months, sort=True)
+    values = pd.to_numeric(df['value']).fillna(0).to_numpy(dtype=np.float64)
+    shape = (len(keywords), len(month_index))
+    matrix = np.bincount(keyword_codes * shape[1] + month_codes, weights=values,
+                         minlength=shape[0] * shape[1]).reshape(shape)
+    totals = matrix.sum(axis=1)
+    peaks = matrix.argmax(axis=1) if shape[1] else np.zeros(shape[0], dtype=np.intp) #the first maximum
+    order = np.lexsort((np.arange(shape[0]), -totals)) #by total, then by keyword because keywords are sorted
+    if n is not None:
+        order = order[:n]
+    return pd.DataFrame({
+        'keyword': keywords[order],
+        'total': totals[order].round().astype(np.int64),
+        'month': pd.to_datetime(month_index[peaks[order]]) if shape[1] else pd.to_datetime([]),
+        'rank': np.arange(1, len(order) + 1),
+    })
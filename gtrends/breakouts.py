@@ -0,0 +1,158 @@
+# coding: utf-8
+
+#Detection of the keywords that suddenly break out. The stored series (dataframes with the columns keyword, date and
+#value, like the output of to_dbtable or Storage.iter_points) are put into a keywords x dates float32 matrix on a
+#regular date axis (daily, or weekly for the long timeframes that Google Trends returns weekly) that only keeps the
+#dates the scores need, and every score is computed for all the keywords at once on slices of the matrix:
+#
+#    zscore      how far the value of the date is from the mean of the window before it, in standard deviations
+#    wow         the growth of the mean of the last week over the mean of the week before it (1.0 is +100%)
+#    seasonal    the mean of the last week minus the mean of the same week one season (52 weeks) earlier
+#
+#New dates and new keywords are added with add (or update, which also scores the latest date), so a detector that
+#is kept (see save and load) only has to be given the points that arrived since the last run
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+class BreakoutDetector:
+    def __init__(self, window_days=28, week_days=7, season_days=364, min_std=1.0):
+        self.window_days = window_days #the window of the mean and standard deviation of the zscore
+        self.week_days = week_days
+        self.season_days = season_days
+        self.min_std = min_std #a flat series has a standard deviation of 0, its zscore is divided by this instead
+        self.keywords = pd.Index([], dtype=object)
+        self.matrix = np.empty((0, 0), dtype=np.float32) #more rows than keywords, they are added by doubling
+        self.origin = None #the first date ever added, in nanoseconds, and the step of the date axis (a day until
+        self.step = 86400 * 10 ** 9 #the first points are added)
+        self.start = 0 #the column 0 of the matrix is the date origin + start * step
+
+    #the number of points of the date axis in a number of days
+    def points(self, days):
+        return max(1, int(round(days * 86400e9 / self.step)))
+
+    #the number of dates that the scores of the latest date need
+    @property
+    def history(self):
+        week = self.points(self.week_days)
+        return max(self.points(self.window_days), 2 * week, self.points(self.season_days) + week) + 1
+
+    @property
+    def dates(self):
+        if self.origin is None:
+            return pd.DatetimeIndex([], name='date')
+        return pd.DatetimeIndex(self.origin + (self.start + np.arange(self.matrix.shape[1])) * self.step, name='date')
+
+    #return the rows of the given keywords, adding the new ones
+    def rows(self, keywords):
+        indexer = self.keywords.get_indexer(keywords)
+        new = keywords[indexer == -1]
+        if len(new):
+            size = len(self.keywords)
+            indexer[indexer == -1] = np.arange(size, size + len(new))
+            self.keywords = self.keywords.append(new)
+            if len(self.keywords) > self.matrix.shape[0]:
+                matrix = np.full((max(2 * self.matrix.shape[0], len(self.keywords), 1024), self.matrix.shape[1]),
+                                 np.nan, dtype=np.float32)
+                matrix[:size] = self.matrix[:size]
+                self.matrix = matrix
+        return indexer
+
+    #add the points of a dataframe with the columns keyword, date and value, chunk_size rows at a time so the
+    #temporary arrays stay small. Points that are already there are replaced, and the dates that are too old for the
+    #scores of the latest date are dropped
+    def add(self, df, chunk_size=1000000):
+        for start in range(0, len(df), chunk_size):
+            self.add_chunk(df.iloc[start:start + chunk_size])
+        return self
+
+    def add_chunk(self, df):
+        dates = pd.to_datetime(df['date']).to_numpy().astype('datetime64[ns]').view(np.int64)
+        if self.origin is None:
+            unique = np.unique(dates)
+            self.step = int(np.median(np.diff(unique))) if len(unique) > 1 else 86400 * 10 ** 9
+            self.origin = int(unique[0])
+            self.start = 0
+        offsets = dates - self.origin
+        positions = offsets // self.step
+        on_axis = offsets % self.step == 0 #a date between two points of the axis is ignored
+        end = max(self.start + self.matrix.shape[1], int(positions.max()) + 1)
+        start = max(min(self.start, int(positions.min())) if self.matrix.shape[1] else int(positions.min()),
+                    end - self.history)
+        if (start, end) != (self.start, self.start + self.matrix.shape[1]):
+            matrix = np.full((self.matrix.shape[0], end - start), np.nan, dtype=np.float32)
+            low, high = max(start, self.start), min(end, self.start + self.matrix.shape[1])
+            if low < high:
+                matrix[:, low - start:high - start] = self.matrix[:, low - self.start:high - self.start]
+            self.matrix, self.start = matrix, start
+        codes, uniques = pd.factorize(df['keyword'])
+        rows = self.rows(pd.Index(np.asarray(uniques, dtype=object)))[codes]
+        columns = positions - start
+        keep = on_axis & (columns >= 0)
+        self.matrix[rows[keep], columns[keep]] = pd.to_numeric(df['value']).to_numpy(dtype=np.float32)[keep]
+
+    #the scores of every keyword on a date (the latest one by default): a dataframe with the columns keyword, date,
+    #value, baseline (the mean of the window before the date), zscore, wow and seasonal. A score that does not have
+    #enough history is NaN
+    def scores(self, at=None):
+        x = self.matrix[:len(self.keywords)]
+        dates = self.dates
+        p = len(dates) - 1 if at is None else dates.get_loc(pd.Timestamp(at))
+        window, week, season = self.points(self.window_days), self.points(self.week_days), self.points(self.season_days)
+        nan = np.full(len(x), np.nan, dtype=np.float32)
+        with warnings.catch_warnings(): #a keyword without any point in a slice has a NaN mean
+            warnings.simplefilter('ignore', RuntimeWarning)
+            value = x[:, p] if p >= 0 else nan
+            base = x[:, max(0, p - window):max(0, p)]
+            baseline = np.nanmean(base, axis=1) if base.shape[1] else nan
+            std = np.nanstd(base, axis=1) if base.shape[1] else nan
+            zscore = (value - baseline) / np.fmax(std, self.min_std)
+            current = np.nanmean(x[:, p - week + 1:p + 1], axis=1) if p - week + 1 >= 0 else nan
+            previous = np.nanmean(x[:, p - 2 * week + 1:p - week + 1], axis=1) if p - 2 * week + 1 >= 0 else nan
+            wow = (current - previous) / np.fmax(previous, 1)
+            last = p - season
+            seasonal = current - np.nanmean(x[:, last - week + 1:last + 1], axis=1) if last - week + 1 >= 0 else nan
+        return pd.DataFrame({
+            'keyword': self.keywords,
+            'date': dates[p] if p >= 0 else pd.NaT,
+            'value': value, 'baseline': baseline, 'zscore': zscore, 'wow': wow, 'seasonal': seasonal,
+        })
+
+    #add new points and return the scores of the latest date
+    def update(self, df):
+        return self.add(df).scores()
+
+    #the ranked breakouts of a date: the keywords whose zscore is at least threshold (a spike) or whose week over
+    #week growth is at least min_growth (a rise that lasts, which soon raises the baseline of the zscore), and whose
+    #value is at least min_value, by zscore, then by growth, then by keyword, with their rank. If n is given only the
+    #top n are kept
+    def breakouts(self, n=None, threshold=3.0, min_growth=1.0, min_value=0, at=None):
+        df = self.scores(at)
+        df = df[((df['zscore'] >= threshold) | (df['wow'] >= min_growth)) & (df['value'] >= min_value)]
+        order = np.lexsort((df['keyword'].to_numpy(dtype=str), -df['wow'].fillna(-np.inf).to_numpy(),
+                            -df['zscore'].to_numpy()))
+        if n is not None:
+            order = order[:n]
+        df = df.iloc[order].reset_index(drop=True)
+        df.insert(0, 'rank', np.arange(1, len(df) + 1))
+        return df
+
+    #save the detector to a .npz file, to add the next dates to it in a later run
+    def save(self, path):
+        np.savez(path, matrix=self.matrix[:len(self.keywords)], keywords=self.keywords.to_numpy(dtype=str),
+                 axis=np.array([self.origin or 0, self.step, self.start, self.origin is not None]),
+                 options=np.array([self.window_days, self.week_days, self.season_days, self.min_std]))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            detector = cls(*data['options'][:3].astype(int).tolist(), min_std=float(data['options'][3]))
+            origin, step, start, used = data['axis'].tolist()
+            if used:
+                detector.origin, detector.step, detector.start = origin, step, start
+                detector.keywords = pd.Index(data['keywords'].astype(object))
+                detector.matrix = data['matrix']
+        return detector
@@ -0,0 +1,90 @@
+# coding: utf-8
+
+#Reading the excel file of keywords that the trends are fetched for
+
+import hashlib
+import os
+import unicodedata
+
+import pandas as pd
+
+#change it when the way the file is parsed changes, so the cached catalogs are parsed again
+CATALOG_VERSION = 1
+
+
+#return the normalized form of a column of keywords: Unicode NFC (so a Vietnamese letter typed with combining
+#accents is the same as the precomposed one) with the whitespace collapsed to single spaces, and empty cells as NaN
+def normalize_keywords(series):
+    series = series.astype('string').str.normalize('NFC').str.replace(r'\s+', ' ', regex=True).str.strip()
+    return series.mask(series == '').astype(object).where(series.notna(), float('nan'))
+
+
+#return the key that two spellings of the same keyword share: the normalized keyword (see normalize_keywords) in
+#lower case, since Google Trends ignores the case
+def keyword_key(keyword):
+    return ' '.join(unicodedata.normalize('NFC', str(keyword)).split()).casefold()
+
+
+#this is a function that accepts an excel file name or path and returns a dataframe for this file, with one column
+#per topic. Only the given sheet and columns (usecols, like pd.read_excel) are read. The special characters and
+#spaces are removed from the column names, the keywords are normalized (see normalize_keywords), and a keyword
+#that is written with other cases or spaces in several places is written everywhere like its first occurrence, so
+#Google Trends, which ignores the case, is asked about it once. The parsed file is cached in cache_dir under the
+#hash of its content, so a file that did not change is loaded from the cache
+def get_data(xlsx_file_path, sheet_name=0, usecols=None, cache_dir='catalog_cache'):
+    digest = hashlib.sha256()
+    with open(xlsx_file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    digest.update(repr((CATALOG_VERSION, sheet_name, usecols)).encode('utf-8'))
+    cached = os.path.join(cache_dir, digest.hexdigest() + '.parquet') if cache_dir else None
+    if cached and os.path.exists(cached):
+        return pd.read_parquet(cached)
+
+    df = pd.read_excel(xlsx_file_path, sheet_name=sheet_name, usecols=usecols, dtype=object)
+    #if there are any special characters in the column names, replace them, and delete any spaces
+    df.columns = (df.columns.astype(str).str.replace(r'[/*?:\[\]]', '_', regex=True)
+                  .str.replace(' ', '', regex=False))
+    df = df.apply(normalize_keywords)
+    values = df.to_numpy(dtype=object).ravel(order='F') #the keywords column by column
+    cells = pd.Series(values).dropna()
+    first = cells.groupby(cells.str.casefold().to_numpy(), sort=False).transform('first')
+    values = values.copy()
+    values[first.index] = first.to_numpy()
+    df = pd.DataFrame(values.reshape(df.shape, order='F'), index=df.index, columns=df.columns)
+    if cached:
+        os.makedirs(cache_dir, exist_ok=True)
+        df.to_parquet(cached + '.tmp')
+        os.replace(cached + '.tmp', cached)
+    return df
+
+
+#return the (topic, keyword) pairs of the dataframe returned by get_data, topic by topic
+def keyword_topics(df):
+    pairs = df.melt(var_name='topic', value_name='keyword').dropna(subset=['keyword'])
+    return pairs.drop_duplicates().reset_index(drop=True)
+
+
+#return every keyword of the dataframe returned by get_data once, in the order they first appear topic by topic
+def unique_keywords(df):
+    return list(pd.unique(keyword_topics(df)['keyword']))
+
+
+#return the dataframe returned by get_data with the keywords of a (topic, keyword) dataframe (like the one returned
+#by crawl_related) added at the end of their topic columns. A new topic gets a new column, and a keyword that is
+#already in the catalog (with any case or spacing) or twice in the new ones is added once
+def extend_catalog(df, pairs):
+    pairs = pairs[['topic', 'keyword']].assign(keyword=normalize_keywords(pairs['keyword'])).dropna()
+    known = set(keyword_topics(df)['keyword'].map(keyword_key))
+    keys = pairs['keyword'].map(keyword_key)
+    pairs = pairs[~keys.isin(known) & ~keys.duplicated()]
+    columns = {}
+    for topic in pd.unique(pd.concat([df.columns.to_series(), pairs['topic']], ignore_index=True)):
+        old = df[topic].dropna() if topic in df.columns else pd.Series(dtype=object)
+        columns[topic] = pd.concat([old, pairs.loc[pairs['topic'] == topic, 'keyword']], ignore_index=True)
+    return pd.DataFrame(columns, dtype=object)
+
+
+#save a catalog like the one returned by get_data or extend_catalog as an excel file that get_data can read
+def save_catalog(df, xlsx_file_path):
+    df.to_excel(xlsx_file_path, index=False)
@@ -0,0 +1,83 @@
+# coding: utf-8
+
+#Rendering of the PNG charts. A chart is described by a spec, a dictionary with the data to draw (a dataframe with
+#the columns keyword and value), the kind ('line' or 'bar'), the title and the output file. Many specs are rendered
+#at once in a pool of processes with the headless Agg backend, and every rendered chart is kept in a cache folder
+#under the hash of its spec, so a chart whose data did not change is copied from the cache instead of drawn again
+
+import hashlib
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+#change it when the look of the charts changes, so the cached charts are drawn again
+CHART_VERSION = 1
+
+
+#return the hash of everything that changes how a chart looks
+def chart_key(spec):
+    digest = hashlib.sha256()
+    digest.update('{}|{}|{}'.format(CHART_VERSION, spec['kind'], spec['title']).encode('utf-8'))
+    data = spec['data'][['keyword', 'value']]
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    digest.update('|'.join(map(str, data['keyword'])).encode('utf-8'))
+    return digest.hexdigest()
+
+
+#draw one chart and save it. The y axis starts at 0 (or at a little below the smallest value for a line chart)
+#and ends a little above the largest value, so the limits fit any data
+def render_chart(spec, path=None):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    data = spec['data']
+    sns.set_style('whitegrid')
+    fig, ax = plt.subplots(figsize=(10,6))
+    if spec['kind'] == 'line':
+        sns.lineplot(data=data, x='keyword', y='value', ax=ax, sort=False)
+    else:
+        sns.barplot(data=data, x='keyword', y='value', ax=ax)
+    if not data.empty:
+        low, high = data['value'].min(), data['value'].max()
+        margin = (high - low) * 0.1 or max(abs(high) * 0.1, 1)
+        ax.set_ylim(0 if spec['kind'] == 'bar' or low - margin < 0 else low - margin, high + margin)
+    ax.set_title(spec['title'])
+    ax.tick_params(axis='x', labelrotation=30 if len(data) > 5 else 0)
+    fig.tight_layout()
+    #saved under a temporary name first, so a worker that dies while saving cannot leave a truncated chart in the cache
+    path = path or spec['output']
+    root, ext = os.path.splitext(path)
+    tmp_path = '{}.{}.tmp{}'.format(root, os.getpid(), ext)
+    fig.savefig(tmp_path)
+    plt.close(fig)
+    os.replace(tmp_path, path)
+    return spec['output']
+
+
+#render a list of chart specs and return the outputs that had to be drawn. The charts that are in the cache are
+#copied from it, the other ones are drawn in a pool of max_workers processes (in this process if there is only one
+#chart to draw, since starting a pool takes longer than drawing it)
+def render_charts(specs, max_workers=None, cache_dir='chart_cache'):
+    os.makedirs(cache_dir, exist_ok=True)
+    todo = []
+    for spec in specs:
+        cached = os.path.join(cache_dir, chart_key(spec) + '.png')
+        if os.path.exists(cached):
+            os.makedirs(os.path.dirname(os.path.abspath(spec['output'])), exist_ok=True)
+            shutil.copyfile(cached, spec['output'])
+        else:
+            todo.append((spec, cached))
+    if len(todo) == 1 or max_workers == 1:
+        for spec, cached in todo:
+            render_chart(spec, cached)
+    elif todo:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(render_chart, *zip(*todo)))
+    for spec, cached in todo:
+        os.makedirs(os.path.dirname(os.path.abspath(spec['output'])), exist_ok=True)
+        shutil.copyfile(cached, spec['output'])
+    return [spec['output'] for spec, _ in todo]
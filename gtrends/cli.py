@@ -0,0 +1,42 @@
+# coding: utf-8
+
+#Command line entry point: python -m gtrends job.json
+
+import argparse
+import logging
+import sys
+
+from gtrends.metrics import METRICS
+from gtrends.pipeline import EXIT_BAD_JOB, EXIT_FAILED, JobError, load_job, run_job
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='gtrends',
+        description='Fetch Google Trends data into PostgreSQL and export the reports described in a job file')
+    parser.add_argument('job', help='path of the JSON job file')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='write the metrics of the run to this file in the Prometheus text format')
+    parser.add_argument('--log', metavar='FILE', help='write a JSON line per request, load and stage to this file')
+    args = parser.parse_args(argv)
+
+    if args.log:
+        handler = logging.FileHandler(args.log, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger = logging.getLogger('gtrends')
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    try:
+        job = load_job(args.job)
+    except JobError as error:
+        print(error, file=sys.stderr)
+        return EXIT_BAD_JOB
+    try:
+        return run_job(job)
+    except Exception as error:
+        print('The job failed: {}'.format(error), file=sys.stderr)
+        return EXIT_FAILED
+    finally:
+        if args.metrics:
+            METRICS.write(args.metrics)
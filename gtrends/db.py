@@ -0,0 +1,451 @@
+# coding: utf-8
+
+#Saving the trends of the keywords into PostgreSQL
+
+import contextlib
+import io
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import psycopg2
+import psycopg2.pool
+
+from gtrends.metrics import METRICS
+from gtrends.series import to_dbtable #it was defined here, older scripts still import it from gtrends.db
+from gtrends.storage import Storage
+
+
+#a pool of connections to PostgreSQL. A connection is borrowed with "with pool.connection() as conn:" and given
+#back at the end of the block (rolled back first if the block failed), and every connection has a statement
+#timeout in milliseconds so a stuck query cannot block the program forever. The timeout is added to the options
+#of the connection parameters, if they have any (a statement_timeout given there wins)
+class ConnectionPool:
+    def __init__(self, params_dic, minconn=1, maxconn=4, statement_timeout=300000):
+        print('Connecting to the PostgreSQL database...')
+        params_dic = dict(params_dic)
+        options = '-c statement_timeout={} {}'.format(statement_timeout, params_dic.pop('options', '')).strip()
+        self.pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, options=options, **params_dic)
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self.pool.getconn()
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn, close=bool(conn.closed))
+
+    def close(self):
+        self.pool.closeall()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+#return the pool for these connection parameters, creating it the first time, so that the whole menu session (or
+#batch run) opens its connections only once
+def get_pool(params_dic, **kwargs):
+    key = tuple(sorted(params_dic.items()))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(params_dic, **kwargs)
+        return _pools[key]
+
+
+#close every pool, at the end of the program
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+#create the tables in PostgreSQL that keep the trends of every keyword: one row per (keyword, geo, timeframe, date)
+#in trend_points and one row per (keyword, geo, sub-region, timeframe) in trend_regions, both partitioned by geo,
+#the list of fetched timeframes in timeframes, and the monthly and yearly totals of every keyword in trend_monthly
+#and trend_yearly that the reports read
+def connect1(params_dic):
+    """ Create the tables with a connection from the pool """
+    try:
+        commands = (
+        """
+        CREATE TABLE IF NOT EXISTS timeframes (
+            timeframe_id SERIAL PRIMARY KEY,
+            timeframe TEXT UNIQUE NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS trend_points (
+            keyword TEXT NOT NULL,
+            geo TEXT NOT NULL,
+            timeframe_id INT NOT NULL REFERENCES timeframes,
+            date DATE NOT NULL,
+            value INT,
+            trend_type TEXT,
+            PRIMARY KEY (keyword, geo, timeframe_id, date)
+        ) PARTITION BY LIST (geo)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS trend_regions (
+            keyword TEXT NOT NULL,
+            geo TEXT NOT NULL,
+            region TEXT NOT NULL,
+            timeframe_id INT NOT NULL REFERENCES timeframes,
+            value INT,
+            PRIMARY KEY (keyword, geo, region, timeframe_id)
+        ) PARTITION BY LIST (geo)
+        """,
+        """
+        CREATE OR REPLACE VIEW trend_points_latest AS
+            SELECT DISTINCT ON (keyword, geo, date) keyword, geo, date, value, trend_type
+            FROM trend_points
+            ORDER BY keyword, geo, date, timeframe_id DESC
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS trend_monthly (
+            keyword TEXT NOT NULL,
+            geo TEXT NOT NULL,
+            month DATE NOT NULL,
+            total BIGINT NOT NULL,
+            trend_type TEXT,
+            PRIMARY KEY (keyword, geo, month)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS trend_yearly (
+            keyword TEXT NOT NULL,
+            geo TEXT NOT NULL,
+            year INT NOT NULL,
+            total BIGINT NOT NULL,
+            PRIMARY KEY (keyword, geo, year)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS trend_monthly_month ON trend_monthly (geo, month)",
+        "CREATE INDEX IF NOT EXISTS trend_yearly_top ON trend_yearly (geo, year, total DESC)")
+        with get_pool(params_dic).connection() as conn:
+            cur = conn.cursor()
+            # create the table
+            for command in commands:
+                cur.execute(command)
+            # build the rollups once for the points that were loaded before they existed
+            cur.execute("SELECT NOT EXISTS (SELECT 1 FROM trend_monthly) AND EXISTS (SELECT 1 FROM trend_points)")
+            if cur.fetchone()[0]:
+                rebuild_rollups(cur)
+            # close communication with the PostgreSQL database server
+            cur.close()
+            # commit the changes
+            conn.commit()
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+        raise #the caller decides, the menu goes on and a job exits with EXIT_FAILED
+    print("Connection successful")
+
+
+#insert the data of the trends of the keywords into a table
+def execute_many(conn, df, table):
+    """
+    Using cursor.executemany() to insert the dataframe
+    """
+    # Create a list of lists from the dataframe values
+    lst = [list(x) for x in df.to_numpy()]
+    # Comma-separated dataframe columns
+    cols = ','.join(list(df.columns))
+    # SQL quert to execute
+    query  = "INSERT INTO {} ({}) VALUES(%s,%s,%s,%s)".format(table,cols)
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(query, lst)
+        conn.commit()
+    except (Exception, psycopg2.DatabaseError) as error:
+        print("Error: %s" % error)
+        conn.rollback()
+        cursor.close()
+        return 1
+    METRICS.record_load(table, len(df), time.perf_counter() - start)
+    print("execute_many() done")
+    cursor.close()
+
+
+#write each chunk of the dataframe to an in-memory CSV buffer and send it to the server with COPY
+def copy_chunks(cursor, df, table, chunk_size=100000):
+    # Comma-separated dataframe columns
+    cols = ','.join(list(df.columns))
+    query = "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(table, cols)
+    for start in range(0, len(df), chunk_size):
+        buffer = io.StringIO()
+        df.iloc[start:start + chunk_size].to_csv(buffer, index=False, header=False, date_format='%Y-%m-%d')
+        buffer.seek(0)
+        cursor.copy_expert(query, buffer)
+
+
+#insert the data of the trends of the keywords with COPY instead of one INSERT per row
+def copy_from_df(conn, df, table, chunk_size=100000):
+    """
+    Using cursor.copy_expert() to stream the dataframe through COPY ... FROM STDIN
+    """
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        copy_chunks(cursor, df, table, chunk_size)
+        # Commit once so that a failed chunk rolls back the whole frame
+        conn.commit()
+    except (Exception, psycopg2.DatabaseError) as error:
+        print("Error: %s" % error)
+        conn.rollback()
+        cursor.close()
+        return 1
+    METRICS.record_load(table, len(df), time.perf_counter() - start)
+    print("copy_from_df() done")
+    cursor.close()
+
+
+#create the partition of a table for one geo if it does not exist yet, e.g. trend_points_us_ca for 'US-CA'
+def ensure_partition(cursor, table, geo):
+    partition = table + '_' + ''.join(c if c.isalnum() else '_' for c in geo.lower())
+    cursor.execute("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES IN (%s)".format(partition, table),
+                   (geo,))
+
+
+#return the id of a timeframe, adding it to the timeframes table the first time
+def timeframe_id(cursor, timeframe):
+    cursor.execute("""
+        INSERT INTO timeframes (timeframe) VALUES (%s)
+        ON CONFLICT (timeframe) DO UPDATE SET timeframe = EXCLUDED.timeframe
+        RETURNING timeframe_id""", (timeframe,))
+    return cursor.fetchone()[0]
+
+
+#insert or update the output of to_dbtable for one geo in trend_points. The rows are copied into a temporary table
+#and moved with INSERT ... ON CONFLICT DO UPDATE, so loading the same data twice does not create duplicates
+def upsert_df(conn, df, timeframe, geo='VN', chunk_size=100000):
+    """
+    Using COPY into a staging table and INSERT ... ON CONFLICT to upsert the dataframe
+    """
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        ensure_partition(cursor, 'trend_points', geo)
+        tf_id = timeframe_id(cursor, timeframe)
+        cursor.execute("""
+            CREATE TEMP TABLE trend_stage (keyword TEXT, date DATE, value INT, trend_type TEXT)
+            ON COMMIT DROP""")
+        copy_chunks(cursor, df[['keyword', 'date', 'value', 'trend_type']], 'trend_stage', chunk_size)
+        # A keyword that is in two topics appears twice in the staging table, keep one row per date
+        cursor.execute("""
+            INSERT INTO trend_points (keyword, geo, timeframe_id, date, value, trend_type)
+            SELECT DISTINCT ON (keyword, date) keyword, %s, %s, date, value, trend_type
+            FROM trend_stage
+            ORDER BY keyword, date
+            ON CONFLICT (keyword, geo, timeframe_id, date)
+            DO UPDATE SET value = EXCLUDED.value, trend_type = EXCLUDED.trend_type""", (geo, tf_id))
+        refresh_rollups(cursor, geo)
+        conn.commit()
+    except (Exception, psycopg2.DatabaseError) as error:
+        print("Error: %s" % error)
+        conn.rollback()
+        cursor.close()
+        return 1
+    METRICS.record_load('trend_points', len(df), time.perf_counter() - start)
+    print("upsert_df() done")
+    cursor.close()
+
+
+#insert or update the output of region_trend_concurrent (keyword, geo, region, value, timeframe) in trend_regions,
+#creating the partition of every geo in it
+def upsert_regions(conn, df, chunk_size=100000):
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TEMP TABLE region_stage (keyword TEXT, geo TEXT, region TEXT, value INT, timeframe TEXT)
+            ON COMMIT DROP""")
+        for geo in df['geo'].unique():
+            ensure_partition(cursor, 'trend_regions', geo)
+        for timeframe in df['timeframe'].unique():
+            timeframe_id(cursor, timeframe)
+        copy_chunks(cursor, df[['keyword', 'geo', 'region', 'value', 'timeframe']], 'region_stage', chunk_size)
+        cursor.execute("""
+            INSERT INTO trend_regions (keyword, geo, region, timeframe_id, value)
+            SELECT DISTINCT ON (s.keyword, s.geo, s.region, t.timeframe_id)
+                   s.keyword, s.geo, s.region, t.timeframe_id, s.value
+            FROM region_stage s JOIN timeframes t USING (timeframe)
+            ORDER BY s.keyword, s.geo, s.region, t.timeframe_id
+            ON CONFLICT (keyword, geo, region, timeframe_id)
+            DO UPDATE SET value = EXCLUDED.value""")
+        conn.commit()
+    except (Exception, psycopg2.DatabaseError) as error:
+        print("Error: %s" % error)
+        conn.rollback()
+        cursor.close()
+        return 1
+    METRICS.record_load('trend_regions', len(df), time.perf_counter() - start)
+    print("upsert_regions() done")
+    cursor.close()
+
+
+#recompute the rows of trend_monthly and trend_yearly for the (keyword, month) and (keyword, year) pairs that are
+#in the staging table trend_stage, so loading new points only touches the totals they change. The points are read
+#from trend_points itself, filtered by the staged keywords and months before DISTINCT ON keeps the latest timeframe
+#of every date (going through the view trend_points_latest would sort the whole partition of the geo)
+def refresh_rollups(cursor, geo):
+    cursor.execute("""
+        WITH s AS (SELECT DISTINCT keyword, date_trunc('month', date)::date AS month FROM trend_stage)
+        INSERT INTO trend_monthly (keyword, geo, month, total, trend_type)
+        SELECT p.keyword, %(geo)s, date_trunc('month', p.date)::date, sum(p.value), max(p.trend_type)
+        FROM (SELECT DISTINCT ON (keyword, date) keyword, date, value, trend_type
+              FROM trend_points
+              WHERE geo = %(geo)s
+                AND keyword IN (SELECT keyword FROM trend_stage)
+                AND date_trunc('month', date)::date IN (SELECT month FROM s)
+              ORDER BY keyword, date, timeframe_id DESC) p
+        JOIN s ON s.keyword = p.keyword AND s.month = date_trunc('month', p.date)::date
+        GROUP BY p.keyword, date_trunc('month', p.date)::date
+        ON CONFLICT (keyword, geo, month)
+        DO UPDATE SET total = EXCLUDED.total, trend_type = EXCLUDED.trend_type""", {'geo': geo})
+    cursor.execute("""
+        INSERT INTO trend_yearly (keyword, geo, year, total)
+        SELECT m.keyword, m.geo, s.year, sum(m.total)
+        FROM (SELECT DISTINCT keyword, EXTRACT(YEAR FROM date)::int AS year FROM trend_stage) s
+        JOIN trend_monthly m
+          ON m.keyword = s.keyword AND m.month >= make_date(s.year, 1, 1) AND m.month < make_date(s.year + 1, 1, 1)
+        WHERE m.geo = %(geo)s
+        GROUP BY m.keyword, m.geo, s.year
+        ON CONFLICT (keyword, geo, year)
+        DO UPDATE SET total = EXCLUDED.total""", {'geo': geo})
+
+
+#build trend_monthly and trend_yearly again from every point in trend_points
+def rebuild_rollups(cursor):
+    cursor.execute("TRUNCATE trend_monthly, trend_yearly")
+    cursor.execute("""
+        INSERT INTO trend_monthly (keyword, geo, month, total, trend_type)
+        SELECT keyword, geo, date_trunc('month', date)::date, sum(value), max(trend_type)
+        FROM trend_points_latest
+        GROUP BY 1, 2, 3""")
+    cursor.execute("""
+        INSERT INTO trend_yearly (keyword, geo, year, total)
+        SELECT keyword, geo, EXTRACT(YEAR FROM month)::int, sum(total)
+        FROM trend_monthly
+        GROUP BY 1, 2, 3""")
+
+
+#find the date of the latest stored point of every keyword for a timeframe and a geo
+def latest_points(conn, timeframe, geo='VN'):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT p.keyword, max(p.date)
+        FROM trend_points p JOIN timeframes t USING (timeframe_id)
+        WHERE t.timeframe = %s AND p.geo = %s
+        GROUP BY p.keyword""", (timeframe, geo))
+    latest = dict(cursor.fetchall())
+    cursor.close()
+    return latest
+
+
+#turn rows (keyword, date, value, trend_type) fetched from PostgreSQL into a dataframe, one typed array per column
+def points_frame(rows):
+    keywords, dates, values, trend_types = zip(*rows) if rows else ((), (), (), ())
+    return pd.DataFrame({'keyword': np.array(keywords, dtype=object),
+                         'date': np.array(dates, dtype='datetime64[D]').astype('datetime64[ns]'),
+                         'value': pd.array(values, dtype='Int64'),
+                         'trend_type': np.array(trend_types, dtype=object)})
+
+
+#the PostgreSQL storage backend (see gtrends.storage): the points are upserted in the partitions of trend_points
+#and the reports read the rollups trend_monthly and trend_yearly
+class PostgresStorage(Storage):
+    def __init__(self, params_dic):
+        self.params_dic = params_dic
+
+    def setup(self):
+        connect1(self.params_dic)
+
+    #run a query and return the result as a dataframe
+    def read_query(self, sql, params=None):
+        with get_pool(self.params_dic).connection() as conn:
+            return pd.read_sql(sql, conn, params=params)
+
+    def latest_points(self, timeframe, geo='VN'):
+        with get_pool(self.params_dic).connection() as conn:
+            return latest_points(conn, timeframe, geo)
+
+    def upsert_geo(self, df, timeframe, geo='VN'):
+        with get_pool(self.params_dic).connection() as conn:
+            return upsert_df(conn, df, timeframe, geo)
+
+    def upsert_regions(self, df):
+        with get_pool(self.params_dic).connection() as conn:
+            return upsert_regions(conn, df)
+
+    #the totals come from trend_yearly (an index scan on (geo, year, total DESC)) and the peak month from
+    #trend_monthly with DISTINCT ON (the earliest month on a tie)
+    def top_keywords(self, years, n=10, geo='VN'):
+        sql = """
+                WITH totals AS (
+                    SELECT keyword, sum(total) AS total
+                    FROM trend_yearly
+                    WHERE geo = %(geo)s AND year = ANY(%(years)s)
+                    GROUP BY keyword
+                    ORDER BY total DESC, keyword
+                    LIMIT %(n)s
+                ), peaks AS (
+                    SELECT DISTINCT ON (keyword) keyword, month
+                    FROM trend_monthly
+                    WHERE geo = %(geo)s AND keyword IN (SELECT keyword FROM totals)
+                      AND EXTRACT(YEAR FROM month)::int = ANY(%(years)s)
+                    ORDER BY keyword, total DESC, month
+                )
+                SELECT t.keyword, t.total, p.month
+                FROM totals t JOIN peaks p USING (keyword)
+                ORDER BY t.total DESC, t.keyword
+                ;"""
+        df = self.read_query(sql, {'geo': geo, 'years': list(years), 'n': n})
+        df['month'] = pd.to_datetime(df['month'])
+        return df
+
+    def monthly_trends(self, years, geo='VN'):
+        sql = """
+                SELECT keyword, month AS date, total AS value, trend_type
+                FROM trend_monthly
+                WHERE geo = %(geo)s AND EXTRACT(YEAR FROM month)::int = ANY(%(years)s)
+                ORDER BY trend_type, keyword, month
+                ;"""
+        df = self.read_query(sql, {'geo': geo, 'years': list(years)})
+        df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    #the rows are read with a server-side (named) cursor, chunk_size rows per round trip, so neither the client nor
+    #psycopg2 ever holds more than one chunk; the transaction of the cursor is ended when the last chunk is read or
+    #the export stops
+    def iter_points(self, years, geo='VN', chunk_size=50000):
+        sql = """
+                SELECT keyword, date, value, trend_type
+                FROM trend_points_latest
+                WHERE geo = %(geo)s AND EXTRACT(YEAR FROM date)::int = ANY(%(years)s)
+                ORDER BY keyword, date
+                ;"""
+        with get_pool(self.params_dic).connection() as conn:
+            cur = conn.cursor(name='gtrends_points')
+            cur.itersize = chunk_size
+            try:
+                cur.execute(sql, {'geo': geo, 'years': [int(year) for year in years]})
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield points_frame(rows)
+            finally:
+                if not conn.closed:
+                    cur.close()
+                    conn.rollback()
+
+    #the pool is shared with the rest of the session and closed by close_pools
+    def close(self):
+        pass
@@ -0,0 +1,119 @@
+# coding: utf-8
+
+#Discovery of new keywords from Google Trends. Starting from the keywords of the catalog, the related queries (and
+#optionally the related topics) of every keyword are fetched, and the new ones are fetched in turn, breadth first,
+#up to a given depth. The requests go through the same rate limiter, cache and retries as the trends, and every
+#discovered keyword joins the topic of the keyword it was found from, so it can be added to the catalog
+
+import hashlib
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from gtrends.catalog import keyword_key, keyword_topics
+from gtrends.fetch import RateLimiter, TrendSession, fetch_interest
+from gtrends.metrics import METRICS, log_event
+
+
+#a Bloom filter: a set of strings that takes a fixed number of bits whatever the strings are, at the cost of
+#answering "already seen" for a few strings that were not (about error_rate of them once capacity strings are in)
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)) #number of bits
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    #the bits of a string, from two 64 bit hashes (double hashing)
+    def positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] >> (pos & 7) & 1 for pos in self.positions(key))
+
+    def add(self, key):
+        for pos in self.positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+
+#the keywords that were already seen by a crawl, by their keyword_key, so a keyword is crawled once whatever its
+#case and spacing. It is a set, or a Bloom filter of bloom_capacity keywords for crawls too large for a set (a few
+#new keywords are then taken for seen ones and skipped)
+class Frontier:
+    def __init__(self, bloom_capacity=None, error_rate=0.001):
+        self.seen = BloomFilter(bloom_capacity, error_rate) if bloom_capacity else set()
+
+    #add a keyword and return True if it was not seen before
+    def add(self, keyword):
+        key = keyword_key(keyword)
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        return True
+
+
+#this is a function that discovers new keywords for the topics of a catalog (the dataframe returned by get_data)
+#from the related queries ('queries') and/or related topics ('topics') of its keywords in the given timeframe and
+#geo, breadth first: the seeds (every keyword of the catalog by default) are level 1, the new keywords found from
+#them are crawled at level 2, and so on up to depth. Only the first per_keyword related keywords of each list
+#('top' and/or 'rising') are kept, and the crawl stops after max_keywords new keywords. The keywords are sent
+#batch_size per payload on a pool of max_workers threads that share one rate limiter. It returns a dataframe with the
+#columns topic, keyword, parent (the keyword it was found from), depth, related, list and value, and the list of
+#keywords whose related keywords could not be fetched
+def crawl_related(df, timeframe, depth=1, geo='VN', related=('queries',), lists=('top', 'rising'), seeds=None,
+                  per_keyword=10, max_keywords=None, batch_size=5, max_workers=4, rate=1.0, burst=1, cache=None,
+                  tz=420, bloom_capacity=None, error_rate=0.001, **kwargs): #the other fetch options do not apply
+    limiter = RateLimiter(rate, burst)
+    frontier = Frontier(bloom_capacity, error_rate)
+    pairs = keyword_topics(df).drop_duplicates('keyword')
+    topic_of = dict(zip(pairs['keyword'], pairs['topic']))
+    for keyword in topic_of:
+        frontier.add(keyword)
+    level = [keyword for keyword in (seeds if seeds is not None else topic_of) if keyword in topic_of]
+    found = []
+    failed = []
+
+    session = TrendSession(tz=tz) #one TrendReq per thread of the pool
+
+    def fetch(batch, kind):
+        return fetch_interest(session, batch, timeframe, limiter, cache=cache, geo=geo, related=kind)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for level_depth in range(1, depth + 1):
+            if not level or (max_keywords is not None and len(found) >= max_keywords):
+                break
+            batches = [(kind, tuple(level[i:i+batch_size])) for kind in related
+                       for i in range(0, len(level), batch_size)]
+            jobs = {pool.submit(fetch, list(batch), kind): (kind, batch) for kind, batch in batches}
+            answers = {}
+            for job in as_completed(jobs):
+                kind, batch = jobs[job]
+                try:
+                    answers[kind, batch] = job.result()
+                except Exception as error:
+                    print('Could not fetch the related {} of {}: {}'.format(kind, ', '.join(batch), error))
+                    failed.extend(kw for kw in batch if kw not in failed)
+            #the answers are read in the order of the batches, so the same crawl always finds the same keywords
+            level = []
+            for kind, batch in batches:
+                data = answers.get((kind, batch))
+                if data is None or data.empty:
+                    continue
+                data = data[data['list'].isin(lists)].groupby(['keyword', 'list'], sort=False).head(per_keyword)
+                for parent, name, query, value in data[['keyword', 'list', 'query', 'value']].itertuples(index=False):
+                    if max_keywords is not None and len(found) >= max_keywords:
+                        break
+                    if parent not in topic_of or not frontier.add(query):
+                        continue
+                    topic_of[query] = topic_of[parent]
+                    found.append((topic_of[parent], query, parent, level_depth, kind, name, value))
+                    level.append(query)
+                    METRICS.inc('gtrends_discovered_total', related=kind, list=name)
+            log_event('discovery_level', depth=level_depth, geo=geo, timeframe=timeframe, requests=len(batches),
+                      discovered=len(level))
+            print('Discovered {} new keyword(s) at depth {}'.format(len(level), level_depth))
+    found = pd.DataFrame(found, columns=['topic', 'keyword', 'parent', 'depth', 'related', 'list', 'value'])
+    return found, failed
@@ -0,0 +1,670 @@
+# coding: utf-8
+
+#Fetching the trends of the keywords from Google Trends
+
+import datetime
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import requests
+import pytrends.request
+from pytrends.request import TrendReq
+from pytrends.exceptions import ResponseError
+
+from gtrends.catalog import keyword_topics, unique_keywords
+from gtrends.metrics import METRICS, log_event
+from gtrends.series import SeriesStore
+
+
+#this is a token bucket that is shared by all the threads fetching from Google Trends, so that the number of
+#requests per second stays under the rate limit no matter how many threads are running
+class RateLimiter:
+    def __init__(self, rate, burst=1):
+        self.rate = rate #tokens added per second
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+#a pytrends session for every thread that uses it, created the first time a request needs it. TrendReq asks Google
+#for a cookie as soon as it is created, so it is only created inside fetch_interest, after the rate limiter and
+#within the retries, and never for an answer found in the cache or the checkpoint. hl and tz are read without
+#creating anything, every other attribute is the one of the TrendReq of the current thread
+class TrendSession:
+    def __init__(self, hl='en-US', tz=420):
+        self.hl = hl
+        self.tz = tz
+        self.local = threading.local()
+
+    @property
+    def pytrend(self):
+        if getattr(self.local, 'pytrend', None) is None:
+            self.local.pytrend = TrendReq(hl=self.hl, tz=self.tz)
+        return self.local.pytrend
+
+    def __getattr__(self, name):
+        return getattr(self.pytrend, name)
+
+
+#this is an on-disk cache of Google Trends answers. Every answer is saved as a Parquet file whose name is a hash of
+#the normalized payload (keywords, timeframe, geo, cat, hl, tz). Answers for windows that are already over never
+#expire, answers for windows that include today are stale after ttl_hours, and when the cache grows over max_bytes
+#the least recently used files are deleted
+class TrendCache:
+    def __init__(self, directory='trends_cache', max_bytes=500 * 1024 * 1024, ttl_hours=12):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl_hours * 3600
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, keywords, timeframe, geo, cat, hl, tz, kind='time'):
+        payload = {'keywords': sorted(' '.join(str(kw).split()) for kw in keywords),
+                   'timeframe': ' '.join(timeframe.split()), 'geo': geo.upper(), 'cat': int(cat),
+                   'hl': hl, 'tz': int(tz)}
+        if kind != 'time': #answers of interest_by_region are kept apart from the interest over time
+            payload['kind'] = kind
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.parquet')
+
+    #a window like '2019-01-01 2019-12-31' is closed once its end date is in the past, anything relative to
+    #today ('today 12-m', 'now 7-d', 'all') is open
+    @staticmethod
+    def is_closed(timeframe):
+        parts = timeframe.split()
+        if len(parts) != 2:
+            return False
+        try:
+            end = datetime.date.fromisoformat(parts[1][:10])
+        except ValueError:
+            return False
+        return end < datetime.date.today()
+
+    def get(self, keywords, timeframe, geo, cat, hl, tz, kind='time'):
+        path = self.path(self.key(keywords, timeframe, geo, cat, hl, tz, kind))
+        try:
+            fetched = os.path.getmtime(path)
+            if not self.is_closed(timeframe) and time.time() - fetched > self.ttl:
+                raise FileNotFoundError(path)
+            data = pd.read_parquet(path)
+            os.utime(path, (time.time(), fetched)) #the access time is used for the LRU eviction
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return data
+
+    def put(self, keywords, timeframe, geo, cat, hl, tz, data, kind='time'):
+        if data.empty: #an empty answer can be caused by throttling, so it is fetched again next time
+            return
+        path = self.path(self.key(keywords, timeframe, geo, cat, hl, tz, kind))
+        tmp_path = '{}.{}.tmp'.format(path, threading.get_ident())
+        data.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        with self.lock:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.parquet'):
+                    stat = entry.stat()
+                    files.append((stat.st_atime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+#this is a local checkpoint store (a SQLite file) for the ingestion of menu option 1. Every (geo, topic, keyword,
+#timeframe) unit is saved as soon as it is fetched, and every (geo, topic, timeframe) that has been inserted into the
+#database is marked as loaded, so a run that crashes or gets banned can be started again without fetching or
+#inserting twice
+class Checkpoint:
+    VERSION = 1
+
+    def __init__(self, path='trends_checkpoint.sqlite'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            #a checkpoint written before the geo column existed cannot be resumed, start it again
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] < self.VERSION:
+                self.conn.execute("DROP TABLE IF EXISTS units")
+                self.conn.execute("DROP TABLE IF EXISTS loaded")
+                self.conn.execute("PRAGMA user_version = {}".format(self.VERSION))
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS units (
+                    geo TEXT, topic TEXT, keyword TEXT, timeframe TEXT, data TEXT,
+                    PRIMARY KEY (geo, topic, keyword, timeframe))""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS loaded (
+                    geo TEXT, topic TEXT, timeframe TEXT,
+                    PRIMARY KEY (geo, topic, timeframe))""")
+
+    #save every column of a fetched dataframe as one unit
+    def save(self, geo, topic, timeframe, data):
+        dates = [d.isoformat() for d in data.index]
+        rows = [(geo, topic, kw, timeframe, json.dumps({'dates': dates, 'values': data[kw].tolist()}))
+                for kw in data.columns]
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO units VALUES (?,?,?,?,?)", rows)
+
+    #return a dataframe with the given keywords if all of them are saved, otherwise None
+    def load(self, geo, topic, keywords, timeframe):
+        columns = {}
+        with self.lock:
+            for kw in keywords:
+                row = self.conn.execute(
+                    "SELECT data FROM units WHERE geo=? AND topic=? AND keyword=? AND timeframe=?",
+                    (geo, topic, kw, timeframe)).fetchone()
+                if row is None:
+                    return None
+                columns[kw] = json.loads(row[0])
+        index = pd.DatetimeIndex(columns[keywords[0]]['dates'], name='date') if keywords else None
+        return pd.DataFrame({kw: unit['values'] for kw, unit in columns.items()}, index=index)
+
+    def mark_loaded(self, geo, topic, timeframe):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO loaded VALUES (?,?,?)", (geo, topic, timeframe))
+
+    def loaded_jobs(self):
+        with self.lock:
+            return set(self.conn.execute("SELECT geo, topic, timeframe FROM loaded").fetchall())
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM units")
+            self.conn.execute("DELETE FROM loaded")
+
+
+#this is a function that flattens the answer of related_queries or related_topics (a dictionary of 'top' and
+#'rising' dataframes per keyword) into one dataframe with the columns keyword, list ('top' or 'rising'), query (the
+#title of a related topic), value and type ('query' or the type of the topic), in the order Google ranked them
+def related_frame(result, related):
+    frames = []
+    for keyword, lists in result.items():
+        for name, data in lists.items():
+            if data is None or data.empty:
+                continue
+            if related == 'topics':
+                data = pd.DataFrame({'query': data['topic_title'], 'value': data['value'],
+                                     'type': data['topic_type']})
+            else:
+                data = data[['query', 'value']].assign(type='query')
+            frames.append(data.assign(keyword=keyword, list=name))
+    if not frames:
+        return pd.DataFrame(columns=['keyword', 'list', 'query', 'value', 'type'])
+    return pd.concat(frames, ignore_index=True)[['keyword', 'list', 'query', 'value', 'type']]
+
+
+#this is a function that sends one payload to Google Trends and returns the interest over time, the interest by
+#region if a resolution ('COUNTRY', 'REGION', 'CITY' or 'DMA') is given, or the related queries or topics of every
+#keyword (see related_frame) if related is 'queries' or 'topics'. If Google answers with a 429 or a 5xx error
+#or the request times out, it waits a random time that doubles after every attempt (exponential backoff with full
+#jitter) and tries again, up to the given number of retries. If a cache is given, a fresh cached answer is returned
+#without sending anything, and if a RequestMemo is given, a request that another thread of the run already sent is
+#not sent again
+def fetch_interest(pytrend, keywords, timeframe, limiter=None, retries=5, backoff=1.0, cache=None, geo='VN',
+                   resolution=None, memo=None, related=None):
+    if memo is not None:
+        return memo.get(keywords, (timeframe, geo, resolution, related, pytrend.hl, pytrend.tz),
+                        lambda: fetch_interest(pytrend, keywords, timeframe, limiter, retries, backoff, cache, geo,
+                                               resolution, related=related))
+    if related is not None:
+        kind = 'related_' + related
+    else:
+        kind = 'time' if resolution is None else 'region_' + resolution
+    if cache is not None:
+        data = cache.get(keywords, timeframe, geo, 0, pytrend.hl, pytrend.tz, kind)
+        if data is not None:
+            METRICS.inc('gtrends_cache_hits_total', kind=kind)
+            return data
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        start = time.perf_counter()
+        try:
+            pytrend.build_payload(keywords, cat=0, timeframe=timeframe,geo=geo)
+            if related == 'queries':
+                data = related_frame(pytrend.related_queries(), related)
+            elif related == 'topics':
+                data = related_frame(pytrend.related_topics(), related)
+            elif resolution is None:
+                data = pytrend.interest_over_time()
+            else:
+                data = pytrend.interest_by_region(resolution=resolution, inc_low_vol=True, inc_geo_code=True)
+            elapsed = time.perf_counter() - start
+            METRICS.observe('gtrends_request_seconds', elapsed, kind=kind)
+            METRICS.inc('gtrends_requests_total', kind=kind, status='ok')
+            log_event('request', kind=kind, keywords=keywords, timeframe=timeframe, geo=geo, status='ok',
+                      attempt=attempt, seconds=round(elapsed, 3), rows=len(data))
+            #an empty answer is often a sign of throttling, count it instead of skipping it silently
+            if data.empty:
+                METRICS.inc('gtrends_empty_responses_total', kind=kind, geo=geo)
+                log_event('empty_response', kind=kind, keywords=keywords, timeframe=timeframe, geo=geo)
+            if cache is not None:
+                cache.put(keywords, timeframe, geo, 0, pytrend.hl, pytrend.tz, data, kind)
+            return data
+        except (ResponseError, requests.exceptions.Timeout, requests.exceptions.ConnectionError) as error:
+            elapsed = time.perf_counter() - start
+            response = getattr(error, 'response', None)
+            status = response.status_code if response is not None else None
+            METRICS.observe('gtrends_request_seconds', elapsed, kind=kind)
+            METRICS.inc('gtrends_requests_total', kind=kind, status=status or type(error).__name__)
+            if status == 429:
+                METRICS.inc('gtrends_throttled_total', geo=geo)
+            log_event('request', kind=kind, keywords=keywords, timeframe=timeframe, geo=geo,
+                      status=status or type(error).__name__, attempt=attempt, seconds=round(elapsed, 3))
+            if attempt == retries or (status is not None and status != 429 and status < 500):
+                raise
+            METRICS.inc('gtrends_retries_total', kind=kind)
+            time.sleep(random.uniform(0, backoff * 2 ** attempt))
+
+
+#this is a function takes the name of a topic (a column of keyword_df, the dataframe returned by get_data) and the
+#timeframe during which we want to see the trends as inputs and returns a dataframe that has the number of searches
+#of each keyword of the topic in the given geo (a country code like 'VN' or a region code like 'US-CA')
+def get_trend(name,timeframe,anchor=None,limiter=None,keyword_df=None,cache=None,checkpoint=None,skip_keywords=(),
+              geo='VN',tz=420,memo=None,session=None): 
+    dataset=[]
+    df = pd.DataFrame()
+    pytrend = session if session is not None else TrendSession(tz=tz)
+    keywords = list(dict.fromkeys(keyword_df[name].dropna())) #every keyword of the topic once
+    if anchor is not None:
+        return get_trend_batched(pytrend, keywords, timeframe, anchor, limiter=limiter, cache=cache,
+                                 checkpoint=checkpoint, topic=name, geo=geo)
+    for ele in keywords: 
+        if ele not in skip_keywords:
+            keyword = [ele] 
+            data = checkpoint.load(geo, name, keyword, timeframe) if checkpoint is not None else None
+            if data is None:
+                data = fetch_interest(pytrend, keyword, timeframe, limiter, cache=cache, geo=geo, memo=memo)
+                if not data.empty:
+                    data = data.drop(labels='isPartial',axis=1)
+                    if checkpoint is not None:
+                        checkpoint.save(geo, name, timeframe, data)
+            if not data.empty:
+                dataset.append(data)
+    if dataset: #one concat at the end, concatenating after every keyword took quadratic time
+        df = pd.concat(dataset,axis=1)
+    return df
+
+
+#this remembers the answers of the requests of a run about the given keywords (the keywords that are in more than
+#one topic), so that each of them is sent once per timeframe and geo: the first thread that asks for a keyword
+#sends the request and the other ones wait for its answer. Requests about other keywords are just sent
+class RequestMemo:
+    def __init__(self, keywords):
+        self.keywords = set(keywords)
+        self.lock = threading.Lock()
+        self.futures = {}
+
+    def get(self, keywords, key, fetch):
+        if not self.keywords.issuperset(keywords):
+            return fetch()
+        key = (tuple(keywords),) + key
+        with self.lock:
+            future = self.futures.get(key)
+            owner = future is None
+            if owner:
+                future = self.futures[key] = Future()
+        if not owner:
+            METRICS.inc('gtrends_deduplicated_total')
+            return future.result()
+        try:
+            future.set_result(fetch())
+        except Exception as error:
+            future.set_exception(error)
+        return future.result()
+
+
+#this is a function that splits a list of keywords into batches of up to 5 keywords that all contain the same anchor
+#keyword, and returns the columns kept from each batch: its keywords, and the anchor once (in the first batch) if it
+#is also one of the keywords
+def anchor_batches(keywords, anchor, batch_size=5):
+    others = [kw for kw in keywords if kw != anchor]
+    step = batch_size - 1 #one slot of every batch is taken by the anchor
+    batches = [others[i:i+step] for i in range(0, len(others), step)] or [[]]
+    return [([anchor] if i == 0 and anchor in keywords else []) + batch for i, batch in enumerate(batches)]
+
+
+#this is a function that fetches one batch of anchor_batches with the anchor and returns its columns divided by the
+#average of the anchor column. An empty answer, or an anchor without searches, raises a ValueError: the batch
+#cannot be put on the scale of the anchor, so its keywords must count as failed rather than silently missing
+def fetch_batch(pytrend, columns, timeframe, anchor, limiter=None, cache=None, checkpoint=None, topic=None,
+                geo='VN'):
+    data = checkpoint.load(geo, topic, columns, timeframe) if checkpoint is not None else None
+    if data is not None:
+        return data
+    data = fetch_interest(pytrend, [anchor] + [kw for kw in columns if kw != anchor], timeframe, limiter,
+                          cache=cache, geo=geo)
+    if data.empty:
+        raise ValueError('Google returned no trends for {} in {} ({})'.format(', '.join(columns), timeframe, geo))
+    anchor_mean = data[anchor].mean()
+    if anchor_mean == 0:
+        raise ValueError('The anchor keyword {} has no searches in {} ({}), choose a more popular anchor'
+                         .format(anchor, timeframe, geo))
+    data = data[columns] / anchor_mean
+    if checkpoint is not None:
+        checkpoint.save(geo, topic, timeframe, data)
+    return data
+
+
+#this is a function that fetches the trends of a list of keywords with up to 5 keywords per request instead of one
+#keyword per request. Every batch contains the same anchor keyword, and each batch is divided by the average of
+#its anchor column, so the returned values are relative to the anchor and can be compared across batches and topics
+def get_trend_batched(pytrend, keywords, timeframe, anchor, batch_size=5, limiter=None, cache=None,
+                      checkpoint=None, topic=None, geo='VN'):
+    if not keywords:
+        return pd.DataFrame()
+    dataset = [fetch_batch(pytrend, columns, timeframe, anchor, limiter, cache, checkpoint, topic, geo)
+               for columns in anchor_batches(keywords, anchor, batch_size)]
+    df = pd.concat(dataset,axis=1)
+    return df[[kw for kw in keywords if kw in df.columns]]
+
+
+#this is a function that splits a dataframe with one column per keyword into a dictionary with the dataframe of
+#every topic of keyword_df (the dataframe returned by get_data), its keywords in the order of the topic
+def split_topics(data, keyword_df, topics=None):
+    dic = {}
+    for col in (keyword_df.columns if topics is None else topics):
+        keywords = [kw for kw in dict.fromkeys(keyword_df[col].dropna()) if kw in data.columns]
+        dic[col] = data[keywords] if keywords else pd.DataFrame()
+    return dic
+
+
+#this is a function that takes the dictionary of anchor-relative trends of every topic and rescales all of them
+#together so that the largest value across every topic is 100, like the values returned by Google Trends. The
+#values stay floats, so a point missing from a stitched window stays NaN (to_dbtable turns it into a null)
+def rescale_dict(dic):
+    peak = max((df.max().max() for df in dic.values() if not df.empty), default=0)
+    if not peak > 0: #0, or NaN if every value is missing
+        return dic
+    return {key: (df * 100 / peak).round() for key, df in dic.items()}
+
+
+#this is a function that takes a dataframe that contains the trends of the keywords and the timeframe during which 
+#we want to see the trends as inputs and returns a dictionary that has the number of searches of each 
+#keyword monthly. If an anchor keyword is given, the keywords are fetched in batches that share the anchor and
+#the values of every topic are put on one common scale
+def dict_trend(df,timeframe,anchor=None,cache=None,geo='VN'):
+    if anchor is not None: #a keyword that is in several topics is fetched once
+        pytrend = TrendSession()
+        return rescale_dict(split_topics(get_trend_batched(pytrend, unique_keywords(df), timeframe, anchor,
+                                                           cache=cache, geo=geo), df))
+    dic = {}
+    for col in df.columns:
+        df1 = get_trend(col,timeframe,keyword_df=df,cache=cache,geo=geo)
+        dic[col] = df1
+    return dic
+
+
+#this is a function that splits a timeframe 'YYYY-MM-DD YYYY-MM-DD' that is longer than window_days into windows
+#of window_days days that overlap by overlap_days days, short enough for Google Trends to return daily points. Any
+#other timeframe (a short one, or one like 'today 5-y') is returned as the only window
+def split_timeframe(timeframe, window_days=180, overlap_days=30):
+    try:
+        start, end = (datetime.date.fromisoformat(part) for part in timeframe.split())
+    except ValueError:
+        return [timeframe]
+    if (end - start).days < window_days or overlap_days >= window_days:
+        return [timeframe]
+    window = datetime.timedelta(days=window_days - 1)
+    step = datetime.timedelta(days=window_days - overlap_days)
+    windows = []
+    while True:
+        window_end = start + window
+        if window_end >= end: #the last window ends on the last day and is as long as the other ones
+            windows.append('{} {}'.format((end - window).isoformat(), end.isoformat()))
+            return windows
+        windows.append('{} {}'.format(start.isoformat(), window_end.isoformat()))
+        start += step
+
+
+#this is a function that stitches the dataframes of consecutive overlapping windows into one series per keyword.
+#The ratio between two neighbouring windows is the mean of the earlier one divided by the mean of the later one on
+#the dates they share, computed for every keyword at once, and the cumulative product of the ratios puts every
+#window on the scale of the first one. On the shared dates the earlier window is kept. A ratio that cannot be
+#computed (a keyword missing or without searches on the overlap) is taken as 1. With shared=True one ratio per
+#window is computed from all the keywords together (for anchor-relative values, which must stay comparable
+#between keywords), only over the points that both windows have, so a batch missing from one window does not skew
+#it, and with normalize=True every keyword is rescaled so that its largest value is 100
+def stitch_windows(frames, shared=False, normalize=True):
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    columns = pd.Index(pd.unique(np.concatenate([frame.columns.to_numpy(dtype=object) for frame in frames])))
+    frames = [frame.reindex(columns=columns).astype(np.float64) for frame in frames]
+    ratios = np.ones((len(frames), len(columns)))
+    for i in range(1, len(frames)):
+        overlap = frames[i - 1].index.intersection(frames[i].index)
+        before = frames[i - 1].loc[overlap].to_numpy()
+        after = frames[i].loc[overlap].to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if shared:
+                both = ~np.isnan(before) & ~np.isnan(after)
+                ratio = np.full(len(columns), before[both].sum() / after[both].sum())
+            else:
+                ratio = np.nanmean(before, axis=0) / np.nanmean(after, axis=0)
+        ratios[i] = np.where(np.isfinite(ratio) & (ratio > 0), ratio, 1.0)
+    factors = np.cumprod(ratios, axis=0)
+    stitched = pd.concat([frame * factor for frame, factor in zip(frames, factors)])
+    stitched = stitched[~stitched.index.duplicated(keep='first')].sort_index()
+    if normalize:
+        peaks = stitched.max()
+        #clipped because the division can leave the peak a rounding error above 100
+        stitched = (stitched * 100 / peaks.where(peaks > 0, 100)).clip(0, 100)
+    return stitched
+
+
+#this is a function that fetches the trends of dict_trend_concurrent with an anchor keyword. The keywords of all the
+#topics are fetched once per geo and timeframe, so a keyword that is in several topics is sent in one batch only:
+#the keywords of the catalog are split into anchor_batches, every batch of every window is a job on the pool, and
+#when all the jobs of a (geo, timeframe) are done its keywords are split back into their topics. A topic with a
+#keyword in a batch that failed is a failed job. The batches are saved in the checkpoint under the topic ''
+def anchor_trend_concurrent(df, timeframes, anchor, limiter, max_workers=4, cache=None, checkpoint=None, skip=(),
+                            on_result=None, geos=('VN',), tz=420, windows=None):
+    windows = windows or {timeframe: [timeframe] for timeframe in timeframes}
+    results = {(geo, timeframe): {} for geo in geos for timeframe in timeframes}
+    topics = {key: [col for col in df.columns if (key[0], col, key[1]) not in skip] for key in results}
+    batches = {key: anchor_batches(unique_keywords(df[cols]), anchor) for key, cols in topics.items() if cols}
+    parts = {}
+    lost = {} #the keywords of the failed batches of every (geo, timeframe)
+    failed = []
+
+    session = TrendSession(tz=tz) #one TrendReq per thread of the pool
+
+    def fetch(columns, window, geo):
+        return fetch_batch(session, columns, window, anchor, limiter, cache, checkpoint, '', geo)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        jobs = {pool.submit(fetch, columns, window, key[0]): (key, i, j)
+                for key, key_batches in batches.items()
+                for i, window in enumerate(windows[key[1]]) for j, columns in enumerate(key_batches)}
+        for job in as_completed(jobs):
+            key, i, j = jobs[job]
+            geo, timeframe = key
+            try:
+                parts.setdefault(key, {})[i, j] = job.result()
+            except Exception as error:
+                print('Could not fetch the trends of {} for {} in {}: {}'.format(', '.join(batches[key][j]),
+                                                                                timeframe, geo, error))
+                lost.setdefault(key, set()).update(batches[key][j])
+                parts.setdefault(key, {})[i, j] = pd.DataFrame()
+            if len(parts[key]) < len(windows[timeframe]) * len(batches[key]):
+                continue
+            frames = parts.pop(key)
+            window_frames = []
+            for i in range(len(windows[timeframe])):
+                data = [frames[i, j] for j in range(len(batches[key])) if not frames[i, j].empty]
+                data = pd.concat(data, axis=1) if data else pd.DataFrame()
+                window_frames.append(data.drop(columns=list(lost.get(key, ())), errors='ignore'))
+            data = window_frames[0] if len(window_frames) == 1 else stitch_windows(window_frames, shared=True,
+                                                                                   normalize=False)
+            for col in topics[key]:
+                if lost.get(key, set()).intersection(df[col].dropna()):
+                    METRICS.inc('gtrends_jobs_total', status='failed')
+                    log_event('job_failed', geo=geo, topic=col, timeframe=timeframe,
+                              error='a batch of its keywords could not be fetched')
+                    failed.append((geo, col, timeframe))
+                    continue
+                results[key][col] = split_topics(data, df, [col])[col]
+                print('Fetched the trends of {} for {} in {}'.format(col, timeframe, geo))
+                METRICS.inc('gtrends_jobs_total', status='ok')
+                if on_result is not None:
+                    on_result(geo, timeframe, col, results[key][col])
+    return results, failed
+
+
+#this is a function that does the same thing as dict_trend for several timeframes and geos at once. Every
+#(geo, topic, timeframe) is a job that runs on a pool of threads, all the threads share one rate limiter (so N geos
+#share one request budget instead of N sessions), and the results are collected as soon as each job finishes. A
+#job that still fails after its retries does not stop the other jobs: the function returns a dictionary with one
+#dictionary of topics per (geo, timeframe) and the list of failed (geo, topic, timeframe) jobs. Jobs listed in skip
+#are not run, keywords in skip_keywords[(geo, timeframe)] are not fetched, and on_result(geo, timeframe, topic,
+#dataframe) is called for each job as it finishes. With an anchor the keywords are fetched in batches shared by
+#all the topics (see anchor_trend_concurrent). With compact=True every (geo, timeframe) is a SeriesStore instead of
+#a dictionary, and without an anchor every topic is moved into it as soon as it arrives. With stitch=True a long
+#timeframe is fetched as overlapping windows of window_days days (see split_timeframe), all the windows of all the
+#jobs run on the pool at the same time, and the windows of a job are stitched into daily series by stitch_windows
+def dict_trend_concurrent(df, timeframes, anchor=None, max_workers=4, rate=1.0, burst=1, cache=None,
+                          checkpoint=None, skip=(), on_result=None, skip_keywords=None, geos=('VN',), tz=420,
+                          compact=False, stitch=False, window_days=180, overlap_days=30):
+    limiter = RateLimiter(rate, burst)
+    skip_keywords = skip_keywords or {}
+    results = {(geo, timeframe): {} for geo in geos for timeframe in timeframes}
+    windows = {timeframe: split_timeframe(timeframe, window_days, overlap_days) if stitch else [timeframe]
+               for timeframe in timeframes}
+    if anchor is not None:
+        results, failed = anchor_trend_concurrent(df, timeframes, anchor, limiter, max_workers, cache, checkpoint,
+                                                  skip, on_result, geos, tz, windows)
+        results = {key: rescale_dict(dic) for key, dic in results.items()}
+        if compact:
+            results = {key: SeriesStore.from_dict(dic) for key, dic in results.items()}
+        return results, failed
+    stores = {key: SeriesStore() for key in results} if compact else None
+    pairs = keyword_topics(df)
+    memo = RequestMemo(pairs.loc[pairs['keyword'].duplicated(), 'keyword'])
+    session = TrendSession(tz=tz) #one TrendReq per thread of the pool
+    parts = {}
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        jobs = {pool.submit(get_trend, col, window, None, limiter, df, cache, checkpoint,
+                            skip_keywords.get((geo, timeframe), ()), geo, tz, memo, session): (geo, col, timeframe, i)
+                for geo in geos for timeframe in timeframes for col in df.columns
+                if (geo, col, timeframe) not in skip
+                for i, window in enumerate(windows[timeframe])}
+        for job in as_completed(jobs):
+            geo, col, timeframe, i = jobs[job]
+            if (geo, col, timeframe) in failed: #another window of the job already failed
+                continue
+            try:
+                parts.setdefault((geo, col, timeframe), {})[i] = job.result()
+            except Exception as error:
+                print('Could not fetch the trends of {} for {} in {}: {}'.format(col, timeframe, geo, error))
+                METRICS.inc('gtrends_jobs_total', status='failed')
+                log_event('job_failed', geo=geo, topic=col, timeframe=timeframe, error=str(error))
+                failed.append((geo, col, timeframe))
+                parts.pop((geo, col, timeframe), None)
+                continue
+            if len(parts[geo, col, timeframe]) < len(windows[timeframe]):
+                continue
+            frames = parts.pop((geo, col, timeframe))
+            if len(frames) == 1:
+                results[geo, timeframe][col] = frames[0]
+            else:
+                results[geo, timeframe][col] = stitch_windows([frames[i] for i in sorted(frames)])
+            print('Fetched the trends of {} for {} in {}'.format(col, timeframe, geo))
+            METRICS.inc('gtrends_jobs_total', status='ok')
+            if on_result is not None:
+                on_result(geo, timeframe, col, results[geo, timeframe][col])
+            if stores is not None:
+                stores[geo, timeframe].add(col, results[geo, timeframe].pop(col))
+    if stores is not None:
+        return stores, failed
+    for key, dic in results.items():
+        results[key] = {col: dic[col] for col in df.columns if col in dic}
+    return results, failed
+
+
+#this is a function that fetches how the searches of every keyword in the dataframe are split between the
+#sub-regions of each geo (interest_by_region) for each timeframe, with the same thread pool and rate limiter as
+#dict_trend_concurrent. It returns a long dataframe with the columns keyword, geo, region, value and timeframe, and
+#the list of failed (geo, keyword, timeframe) jobs
+def region_trend_concurrent(df, timeframes, geos=('VN',), resolution='REGION', max_workers=4, rate=1.0, burst=1,
+                            cache=None, tz=420, **kwargs): #the other options of dict_trend_concurrent do not apply
+    limiter = RateLimiter(rate, burst)
+    keywords = unique_keywords(df)
+    session = TrendSession(tz=tz) #one TrendReq per thread of the pool
+
+    def fetch(keyword, timeframe, geo):
+        data = fetch_interest(session, [keyword], timeframe, limiter, cache=cache, geo=geo, resolution=resolution)
+        if data.empty:
+            return None
+        return pd.DataFrame({'keyword': keyword, 'geo': geo, 'region': data['geoCode'].to_numpy(),
+                             'value': data[keyword].to_numpy(), 'timeframe': timeframe})
+
+    frames = []
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        jobs = {pool.submit(fetch, keyword, timeframe, geo): (geo, keyword, timeframe)
+                for geo in geos for timeframe in timeframes for keyword in keywords}
+        for job in as_completed(jobs):
+            try:
+                data = job.result()
+            except Exception as error:
+                print('Could not fetch the regions of {1} for {2} in {0}: {3}'.format(*jobs[job], error))
+                failed.append(jobs[job])
+                continue
+            if data is not None:
+                frames.append(data)
+    if not frames:
+        return pd.DataFrame(columns=['keyword', 'geo', 'region', 'value', 'timeframe']), failed
+    return pd.concat(frames, ignore_index=True), failed
+
+
+#this is a function that points pytrends at another server that has the same API as Google Trends, for example a
+#local stub server (base_url='http://127.0.0.1:8000/trends') used to test the fetching code without the internet
+def use_trends_server(base_url):
+    old_url = pytrends.request.BASE_TRENDS_URL
+    pytrends.request.BASE_TRENDS_URL = base_url
+    for attr in dir(TrendReq):
+        value = getattr(TrendReq, attr)
+        if attr.endswith('_URL') and isinstance(value, str) and value.startswith(old_url):
+            setattr(TrendReq, attr, base_url + value[len(old_url):])
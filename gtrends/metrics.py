@@ -0,0 +1,150 @@
+# coding: utf-8
+
+#Instrumentation of the pipeline. The counters and histograms of a run are kept in METRICS and can be written as a
+#Prometheus text file (for the node exporter textfile collector, or to read after the run), and every notable
+#event (a request, a retry, a throttled or empty answer, a load, a stage) is also logged as one JSON line on the
+#"gtrends" logger, which python -m gtrends --log FILE writes to a file
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('gtrends')
+
+#upper bounds of the buckets of the histograms, in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+
+HELP = {
+    'gtrends_requests_total': 'Requests sent to Google Trends by outcome',
+    'gtrends_request_seconds': 'Latency of the requests sent to Google Trends',
+    'gtrends_retries_total': 'Requests that were retried after a 429, a 5xx or a timeout',
+    'gtrends_throttled_total': 'Answers with the status 429 Too Many Requests',
+    'gtrends_empty_responses_total': 'Answers without any data',
+    'gtrends_cache_hits_total': 'Requests answered from the local cache',
+    'gtrends_deduplicated_total': 'Requests about a keyword of several topics answered by another thread',
+    'gtrends_discovered_total': 'New keywords found in the related queries and topics of the catalog',
+    'gtrends_jobs_total': 'Fetch jobs (geo, topic, timeframe) by outcome',
+    'gtrends_rows_loaded_total': 'Rows written to the storage',
+    'gtrends_load_seconds_total': 'Time spent writing rows to the storage',
+    'gtrends_rows_per_second': 'Rows written to the storage per second of loading',
+    'gtrends_stage_seconds': 'Wall time of the stages of the run',
+}
+
+
+#write one structured log line
+def log_event(event, **fields):
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(dict(event=event, time=round(time.time(), 3), **fields), ensure_ascii=False,
+                               default=str))
+
+
+#the counters, gauges and histograms of a run. Every metric has a name and optional labels
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[name, tuple(sorted(labels.items()))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            counts, total = self.histograms.get(key, ([0] * len(BUCKETS), 0.0))
+            counts = [count + (value <= bound) for count, bound in zip(counts, BUCKETS)]
+            self.histograms[key] = (counts, total + value)
+
+    #the sum of a counter over all its labels, or over the labels that match the given ones
+    def total(self, name, **labels):
+        with self.lock:
+            return sum(value for (key, key_labels), value in self.counters.items()
+                       if key == name and set(labels.items()) <= set(key_labels))
+
+    #measure the wall time of a stage: with METRICS.stage('fetch'): ...
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        log_event('stage_start', stage=name)
+        status = 'failed'
+        try:
+            yield
+            status = 'ok'
+        finally:
+            elapsed = time.perf_counter() - start
+            self.set('gtrends_stage_seconds', elapsed, stage=name)
+            log_event('stage_end', stage=name, status=status, seconds=round(elapsed, 3))
+
+    #count the rows written to a table and the time it took
+    def record_load(self, table, rows, seconds):
+        self.inc('gtrends_rows_loaded_total', rows, table=table)
+        self.inc('gtrends_load_seconds_total', seconds, table=table)
+        log_event('load', table=table, rows=rows, seconds=round(seconds, 3))
+
+    #the metrics in the Prometheus text format
+    def render(self):
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = dict(self.histograms)
+        #rows per second of every table, from the two load counters
+        for (name, labels), seconds in counters.items():
+            if name == 'gtrends_load_seconds_total' and seconds > 0:
+                rows = counters.get(('gtrends_rows_loaded_total', labels), 0)
+                gauges['gtrends_rows_per_second', labels] = rows / seconds
+
+        def labels_text(labels, extra=()):
+            labels = list(labels) + list(extra)
+            if not labels:
+                return ''
+            return '{' + ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                                  for k, v in labels) + '}'
+
+        lines = []
+        for kind, metrics in (('counter', counters), ('gauge', gauges), ('histogram', histograms)):
+            for name in sorted({name for name, _ in metrics}):
+                lines.append('# HELP {} {}'.format(name, HELP.get(name, name)))
+                lines.append('# TYPE {} {}'.format(name, kind))
+                for (key, labels), value in sorted(metrics.items(), key=lambda item: str(item[0])):
+                    if key != name:
+                        continue
+                    if kind != 'histogram':
+                        lines.append('{}{} {}'.format(name, labels_text(labels), value))
+                        continue
+                    counts, total = value
+                    for bound, count in zip(BUCKETS, counts):
+                        le = '+Inf' if bound == float('inf') else bound
+                        lines.append('{}_bucket{} {}'.format(name, labels_text(labels, [('le', le)]), count))
+                    lines.append('{}_sum{} {}'.format(name, labels_text(labels), total))
+                    lines.append('{}_count{} {}'.format(name, labels_text(labels), counts[-1]))
+        return '\n'.join(lines) + '\n'
+
+    #write the metrics to a file, through a temporary file so a collector never reads half of it
+    def write(self, path):
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(path + '.tmp', path)
+
+    #a one line summary of the requests, for the end of a fetch
+    def summary(self):
+        return ('Requests: {}, throttled (429): {}, retries: {}, empty answers: {}, failed jobs: {}'
+                .format(int(self.total('gtrends_requests_total')), int(self.total('gtrends_throttled_total')),
+                        int(self.total('gtrends_retries_total')), int(self.total('gtrends_empty_responses_total')),
+                        int(self.total('gtrends_jobs_total', status='failed'))))
+
+
+METRICS = Metrics()
@@ -0,0 +1,249 @@
+# coding: utf-8
+
+#The fetch -> load -> report pipeline, run from a job file without any input from the user. The fetch stage
+#(pytrends, requests) is only imported when a job fetches something and psycopg2 when a job uses PostgreSQL, so
+#report-only runs start quickly
+
+import datetime
+import json
+import os
+import sys
+
+import pandas as pd
+
+from gtrends.metrics import METRICS
+from gtrends.series import SeriesStore, to_dbtable
+from gtrends.reports import REPORTS
+from gtrends.storage import get_storage, close_storages
+
+
+#exit statuses of a job
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_BAD_JOB = 2
+EXIT_PARTIAL = 3
+
+
+#raised when a job file is missing something or has a wrong value
+class JobError(ValueError):
+    pass
+
+
+#the earliest date the last point of a closed timeframe 'YYYY-MM-DD YYYY-MM-DD' can have. Google returns daily points
+#up to 269 days (and stitch=True fetches every timeframe as daily windows), weekly points up to five years, dated by
+#the first day of their week, and monthly points above that, dated by the first day of their month
+def last_point_date(timeframe, stitch=False):
+    start, end = (datetime.date.fromisoformat(part[:10]) for part in timeframe.split())
+    days = (end - start).days
+    if stitch or days <= 269:
+        return end
+    if days <= 5 * 365 + 1:
+        return end - datetime.timedelta(days=6)
+    return end.replace(day=1)
+
+
+#this is a function that fetches the trends of every topic for every timeframe and every geo and upserts each topic
+#into the storage backend (the partition of its geo in trend_points) as soon as it arrives. Progress is kept in a
+#checkpoint, so running it again after a crash skips the topics that are already saved. Only the delta is moved:
+#keywords whose stored points of a window that is over reach its last point (see last_point_date) are not fetched
+#again, and for the other keywords of such a window only the points from the latest stored date onwards are written
+#(the latest one is rewritten because it may have been partial), which completes a window loaded while it was open. A window that is still open ('today 12-m', or one that ends after today) is rescaled 0-100 by Google at
+#every fetch, so the whole fetched window is written, otherwise the old and the new points of one timeframe would
+#be on two scales. With an anchor keyword every topic of a (geo, timeframe) has to be rescaled together, so all the
+#keywords are fetched, the topics are upserted after all of them arrive, and the whole window is written too. With
+#compact=True the fetched topics of an anchor run are kept in a SeriesStore until they are upserted; without an
+#anchor every topic is upserted as it arrives, so nothing is kept and compact is ignored
+def ingest(df, timeframes, storage, anchor=None, geos=('VN',), cache=None, checkpoint=None, **kwargs):
+    from gtrends.fetch import TrendCache, Checkpoint, dict_trend_concurrent
+
+    if checkpoint is None:
+        checkpoint = Checkpoint()
+    loaded = checkpoint.loaded_jobs()
+    latest = {(geo, timeframe): storage.latest_points(timeframe, geo) for geo in geos for timeframe in timeframes
+              if TrendCache.is_closed(timeframe)}
+    skip_keywords = {}
+    for (geo, timeframe), points in latest.items():
+        last = last_point_date(timeframe, kwargs.get('stitch', False))
+        skip_keywords[geo, timeframe] = {kw for kw, date in points.items() if date >= last}
+
+    #data is the dataframe of the topic or the SeriesStore that holds it
+    def load(geo, timeframe, topic, data):
+        if (geo, topic, timeframe) in loaded:
+            return
+        new_df = to_dbtable(data if isinstance(data, SeriesStore) else {topic: data}, [topic], geo)
+        if anchor is None and TrendCache.is_closed(timeframe):
+            since = pd.to_datetime(new_df['keyword'].astype(object).map(latest[geo, timeframe]))
+            new_df = new_df[~(new_df['date'] < since)]
+        if new_df.empty or storage.upsert(new_df, timeframe) != 1:
+            checkpoint.mark_loaded(geo, topic, timeframe)
+            loaded.add((geo, topic, timeframe))
+
+    if anchor is None:
+        kwargs.pop('compact', None)
+        results, failed = dict_trend_concurrent(df, timeframes, cache=cache, checkpoint=checkpoint, skip=loaded,
+                                                on_result=load, skip_keywords=skip_keywords, geos=geos, **kwargs)
+    else:
+        results, failed = dict_trend_concurrent(df, timeframes, anchor, cache=cache, checkpoint=checkpoint,
+                                                geos=geos, **kwargs)
+        for (geo, timeframe), dic in results.items():
+            if isinstance(dic, SeriesStore):
+                for topic in dic.topics:
+                    load(geo, timeframe, topic, dic)
+            else:
+                for topic, data in dic.items():
+                    load(geo, timeframe, topic, data)
+    missing = [(geo, col, timeframe) for geo in geos for timeframe in timeframes for col in df.columns
+               if (geo, col, timeframe) not in loaded]
+    if not missing:
+        checkpoint.clear()
+    return missing
+
+
+#create the tables if needed, then fetch the trends of the keywords in the dataframe kt for the timeframes and geos
+#and load them into the storage backend chosen by params_dic (PostgreSQL or the Parquet warehouse). If a resolution
+#is given ('REGION', 'CITY', ...), the split of every keyword between the sub-regions of each geo is fetched too and
+#saved in trend_regions. Returns the (geo, topic, timeframe) jobs that are not saved yet
+def fetch_and_load(params_dic, kt, timeframes, anchor=None, cache_dir='trends_cache', geos=('VN',),
+                   resolution=None, **kwargs):
+    from gtrends.fetch import TrendCache, region_trend_concurrent
+
+    storage = get_storage(params_dic)
+    storage.setup()
+    cache = TrendCache(cache_dir)
+    missing = ingest(kt, timeframes, storage, anchor, geos, cache=cache, **kwargs)
+    if resolution is not None:
+        regions, failed = region_trend_concurrent(kt, timeframes, geos, resolution, cache=cache, **kwargs)
+        if not regions.empty:
+            storage.upsert_regions(regions)
+        if failed:
+            print('Could not fetch the regions of {} keyword(s)'.format(len(failed)))
+    print('Cache hits: {hits}, cache misses: {misses}'.format(**cache.stats()))
+    print(METRICS.summary())
+    return missing
+
+
+#read a job file (JSON) and check it. A job looks like this, every key except database is optional:
+#
+#    {
+#        "database": {"host": "localhost", "database": "trends", "user": "postgres"},
+#        "keywords": "keytrends.xlsx",
+#        "sheet": 0,
+#        "columns": ["Music", "Movies"],
+#        "timeframes": ["2020-01-01 2020-12-31", "2019-01-01 2019-12-31"],
+#        "geos": ["VN", "TH"],
+#        "resolution": "REGION",
+#        "anchor": null,
+#        "discover": {"depth": 2, "related": ["queries"], "per_keyword": 5, "output": "keytrends_discovered.xlsx"},
+#        "fetch": {"max_workers": 4, "rate": 1.0},
+#        "cache": "trends_cache",
+#        "reports": [
+#            {"type": "top_keywords", "years": [2019, 2020], "n": 10, "output": "top_10_trending.xlsx"},
+#            {"type": "chart", "year": 2020, "kind": "line", "output": "top_search_key_2020.png"}
+#        ]
+#    }
+#
+#The password can be left out of the file and given in the PGPASSWORD environment variable (any PG* variable works).
+#With "database": {"backend": "parquet", "path": "trends_warehouse"} the trends are saved in a local folder of
+#Parquet files instead of PostgreSQL and the reports are computed from it with DuckDB. With "discover" the related
+#queries of the keywords are crawled first (see crawl_related, the timeframe and geo are the first ones of the job
+#unless it gives its own), the new keywords are added to their topics and fetched with the other ones, and the
+#grown catalog is saved to the output file if one is given
+def load_job(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            job = json.load(f)
+    except (OSError, ValueError) as error:
+        raise JobError('Cannot read the job file {}: {}'.format(path, error))
+    if not isinstance(job, dict):
+        raise JobError('The job file must contain a JSON object')
+    job.setdefault('database', {})
+    job.setdefault('reports', [])
+    if 'keywords' in job and not job.get('timeframes'):
+        raise JobError('A job with keywords needs at least one timeframe')
+    job.setdefault('geos', ['VN'])
+    if not job['geos'] or not all(isinstance(geo, str) and geo for geo in job['geos']):
+        raise JobError('geos must be a list of country or region codes like "VN" or "US-CA"')
+    job['geos'] = [geo.upper() for geo in job['geos']]
+    if job.get('resolution') not in (None, 'COUNTRY', 'REGION', 'CITY', 'DMA'):
+        raise JobError('Unknown resolution {!r}, choose from COUNTRY, REGION, CITY, DMA'.format(job['resolution']))
+    discover = job.get('discover')
+    if discover is not None:
+        if not isinstance(discover, dict) or 'keywords' not in job:
+            raise JobError('discover must be an object and needs the keywords of the job')
+        if not set(discover.get('related', ['queries'])) <= {'queries', 'topics'}:
+            raise JobError('related must be a list of "queries" and "topics"')
+        if not set(discover.get('lists', ['top'])) <= {'top', 'rising'}:
+            raise JobError('lists must be a list of "top" and "rising"')
+        if not isinstance(discover.get('depth', 1), int) or discover.get('depth', 1) < 1:
+            raise JobError('depth must be a positive number')
+    for report in job['reports']:
+        if report.get('type') not in REPORTS:
+            raise JobError('Unknown report type {!r}, choose from {}'.format(report.get('type'), sorted(REPORTS)))
+        if 'output' not in report:
+            raise JobError('The {} report needs an output file'.format(report['type']))
+    #a relative keyword file is relative to the job file
+    if 'keywords' in job:
+        job['keywords'] = os.path.join(os.path.dirname(os.path.abspath(path)), job['keywords'])
+    if discover and 'output' in discover:
+        discover['output'] = os.path.join(os.path.dirname(os.path.abspath(path)), discover['output'])
+    return job
+
+
+#crawl the related keywords of the catalog kt as asked by the "discover" part of a job, with the rate, burst,
+#max_workers and tz of its "fetch" part unless it gives its own, and return the catalog with the new keywords
+def discover_keywords(kt, job):
+    from gtrends.catalog import extend_catalog, save_catalog
+    from gtrends.discovery import crawl_related
+    from gtrends.fetch import TrendCache
+
+    options = {key: value for key, value in job.get('fetch', {}).items()
+               if key in ('max_workers', 'rate', 'burst', 'tz')}
+    options.update(job['discover'])
+    output = options.pop('output', None)
+    timeframe = options.pop('timeframe', job['timeframes'][0])
+    geo = options.pop('geo', job['geos'][0])
+    found, failed = crawl_related(kt, timeframe, geo=geo, cache=TrendCache(job.get('cache', 'trends_cache')),
+                                  **options)
+    if failed:
+        print('Could not fetch the related keywords of {} keyword(s)'.format(len(failed)))
+    kt = extend_catalog(kt, found)
+    if output:
+        save_catalog(kt, output)
+        print('Saved the catalog with {} new keyword(s) to {}'.format(len(found), output))
+    return kt
+
+
+#run the stages of a job: fetch the trends of the keywords and load them into the database, then export the
+#reports. Returns one of the EXIT_* statuses
+def run_job(job):
+    params_dic = job['database']
+    status = EXIT_OK
+    try:
+        if 'keywords' in job:
+            from gtrends.catalog import get_data
+
+            with METRICS.stage('keywords'):
+                kt = get_data(job['keywords'], job.get('sheet', 0), job.get('columns'))
+            print('Import data successfully')
+            if 'discover' in job:
+                with METRICS.stage('discover'):
+                    kt = discover_keywords(kt, job)
+            with METRICS.stage('fetch_and_load'):
+                missing = fetch_and_load(params_dic, kt, job['timeframes'], job.get('anchor'),
+                                         job.get('cache', 'trends_cache'), job['geos'], job.get('resolution'),
+                                         **job.get('fetch', {}))
+            if missing:
+                print('{} topic(s) are not saved yet, run the job again to resume'.format(len(missing)))
+                status = EXIT_PARTIAL
+            else:
+                print('The required data is successfully fetched and saved into the database')
+        for report in job['reports']:
+            report = dict(report)
+            with METRICS.stage('report:{}:{}'.format(report['type'], report['output'])):
+                REPORTS[report.pop('type')](params_dic, **report)
+    finally:
+        close_storages()
+        if 'gtrends.db' in sys.modules: #a run that never used PostgreSQL has no pool to close
+            from gtrends.db import close_pools
+            close_pools()
+    return status
@@ -0,0 +1,298 @@
+# coding: utf-8
+
+#Reports on the saved trends. The report functions read them from the storage backend chosen by params_dic
+#(PostgreSQL or the local Parquet warehouse, see gtrends.storage). matplotlib and seaborn are only imported by the
+#charts (gtrends.charts)
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from gtrends.storage import get_storage
+
+
+#export the trends of 2019 and 2020 to an excel file
+def top_trending(params_dic):
+    export_points(params_dic, [2019, 2020], 'vn_trending_1920.xlsx', columns=['keyword', 'value', 'date'])
+    print("Xuất thành công báo cáo Top ten trending 2")
+
+
+#export the 2020 trends to an excel file
+def top_trend20(params_dic):
+    export_points(params_dic, [2020], 'vn_trending20.xlsx', columns=['keyword', 'date', 'value', 'trend_type'])
+    print("Xuất thành công báo cáo vn_trending20")
+
+
+#export the 2019 trends to an excel file
+def top_trend19(params_dic):
+    export_points(params_dic, [2019], 'vn_trending19.xlsx', columns=['keyword', 'date', 'value', 'trend_type'])
+    print("Xuất thành công báo cáo vn_trending19")
+
+
+#find the top n most searched keywords in the given years together with their total number of searches and the
+#month in which each of them was searched the most, from the storage backend chosen by params_dic
+def top_keywords(params_dic, years, n=10, geo='VN'):
+    return get_storage(params_dic).top_keywords(years, n, geo)
+
+
+#find the number of searches of every keyword in every month of the given years, one row per (keyword, month)
+#with the month as its first day
+def monthly_trends(params_dic, years, geo='VN'):
+    return get_storage(params_dic).monthly_trends(years, geo)
+
+
+#create the pivot table of one topic: one row per keyword with the number of searches in every month ('Month 1' to
+#'Month 12') and the row number in 'STT'. The dataframe of the topic is not modified
+def topic_pivot(df):
+    pivot = df.assign(date=df['date'].dt.month).pivot_table(index='keyword', columns='date', values='value',
+                                                            aggfunc='sum')
+    pivot.columns = 'Month ' + pivot.columns.astype(str) #change the names of the columns
+    pivot.index.name = 'Keyword'
+    pivot = pivot.reset_index()
+    pivot.insert(0, 'STT', np.arange(1, len(pivot) + 1))
+    return pivot
+
+
+def to_pivot(dic): #create a pivot table for each topic in the original excel file 
+    #add the pivot table corresponding to each topic to a dictionary in which the topics are the keys
+    return {key: topic_pivot(df) for key, df in dic.items()}
+
+
+#write an excel file sheet by sheet with a write-only workbook, which keeps only the row being written in memory
+#instead of the whole workbook. sheets is an iterable of (sheet name, column names, iterable of dataframe chunks),
+#and the sheets and their chunks are only created when they are written, so the memory used does not grow with the
+#number of sheets or rows. Missing values are written as empty cells like DataFrame.to_excel does
+def write_excel_stream(output, sheets):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    for name, columns, chunks in sheets:
+        ws = wb.create_sheet(title=str(name))
+        ws.append(list(columns))
+        for chunk in chunks:
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for row in chunk.itertuples(index=False, name=None):
+                ws.append(row)
+    if not wb.worksheets: #a workbook needs at least one sheet
+        wb.create_sheet()
+    wb.save(output)
+
+
+#split a dataframe into chunks of rows
+def iter_chunks(df, chunk_size=10000):
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+#the largest number of rows of an excel sheet, without the header
+EXCEL_MAX_ROWS = 1048575
+
+
+#split a stream of dataframe chunks into the (sheet name, column names, chunks) sheets of write_excel_stream, with
+#at most max_rows rows per sheet: 'name', 'name (2)', ... The sheets are made while they are written, so the
+#chunks are still read one at a time
+def split_sheets(name, columns, chunks, max_rows=EXCEL_MAX_ROWS):
+    chunks = iter(chunks)
+    pending = [next(chunks, None)] #the chunk (or the rest of a chunk) that the next sheet starts with
+
+    def sheet_chunks():
+        rows = 0
+        while pending[0] is not None and rows < max_rows:
+            chunk = pending[0]
+            yield chunk.iloc[:max_rows - rows]
+            rest = chunk.iloc[max_rows - rows:]
+            rows += len(chunk) - len(rest)
+            pending[0] = rest if len(rest) else next(chunks, None)
+
+    part = 1
+    while True:
+        yield (name if part == 1 else '{} ({})'.format(name, part)), columns, sheet_chunks()
+        if pending[0] is None:
+            return
+        part += 1
+
+
+#write a stream of dataframe chunks to output one chunk at a time, as a CSV, Parquet or excel file depending on its
+#extension (.csv, .parquet or .xlsx), and return the number of rows written. Only the given columns are written
+def write_stream(output, columns, chunks, sheet_name='Sheet1'):
+    columns = list(columns)
+    ext = os.path.splitext(output)[1].lower()
+    if ext not in ('.csv', '.parquet', '.xlsx'):
+        raise ValueError('Cannot export to {}, use a .csv, .parquet or .xlsx file'.format(output))
+    rows = 0
+
+    def counted():
+        nonlocal rows
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk[columns]
+
+    if ext == '.csv':
+        with open(output, 'w', encoding='utf-8', newline='') as f:
+            f.write(','.join(columns) + '\n')
+            for chunk in counted():
+                chunk.to_csv(f, index=False, header=False)
+    elif ext == '.parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in counted():
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output, table.schema)
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            pd.DataFrame(columns=columns).to_parquet(output, index=False)
+    else:
+        write_excel_stream(output, split_sheets(sheet_name, columns, counted()))
+    return rows
+
+
+#export the latest points of the given years and geos (the columns keyword, geo, date, value and trend_type, or the
+#given ones) to a CSV, Parquet or excel file. The points are read from the storage chunk_size rows at a time and
+#every chunk is written before the next one is read, so the memory used does not grow with the number of points
+def export_points(params_dic, years, output, geos=('VN',), columns=('keyword', 'geo', 'date', 'value', 'trend_type'),
+                  chunk_size=50000):
+    storage = get_storage(params_dic)
+
+    def chunks():
+        for geo in geos:
+            for chunk in storage.iter_points(years, geo, chunk_size):
+                yield chunk.assign(geo=geo)
+
+    rows = write_stream(output, columns, chunks())
+    print('{} points are successfully exported to {}'.format(rows, output))
+
+
+#export the ranked breakouts of the latest date of the given years (the keywords whose latest value is far above
+#their recent mean or whose searches at least doubled in a week, see gtrends.breakouts) with their scores to a CSV,
+#Parquet or excel file. The points are read chunk by chunk into the detector, which keeps only the dates it needs
+def report_breakouts(params_dic, years, output='breakouts.xlsx', n=50, geo='VN', threshold=3.0, min_growth=1.0,
+                     min_value=0, chunk_size=50000, **options):
+    from gtrends.breakouts import BreakoutDetector
+
+    detector = BreakoutDetector(**options)
+    for chunk in get_storage(params_dic).iter_points(years, geo, chunk_size):
+        detector.add(chunk)
+    df = detector.breakouts(n, threshold, min_growth, min_value)
+    write_stream(output, df.columns, [df], sheet_name='Breakouts')
+    print('{} breakouts on {} are successfully exported to {}'.format(
+        len(df), detector.dates[-1].date() if len(detector.dates) else '-', output))
+
+
+#export the report of the top n most searched keywords in the given years, with the month in which each of them was
+#searched the most, to an excel file (menu option 2)
+def report_top_keywords(params_dic, years, output='top_10_trending.xlsx', n=10, geo='VN'):
+    new_df = top_keywords(params_dic, years, n, geo)
+    new_df['month'] = new_df['month'].dt.strftime('%m/%y')
+    new_df.insert(0,'STT',range(1, len(new_df)+1))
+    new_df.rename(columns={'keyword':'Keyword','total':'Total Search Count','month':'Date with the most searches'},
+                  inplace=True)
+    new_df.to_excel(output,index=False)
+    print('{} is successfully exported'.format(output))
+
+
+#export the number of searches of each keyword by topic and by month of a year to an excel file with one sheet per
+#topic (menu option 3). The sheets are written one by one with write_excel_stream
+def report_by_topic(params_dic, year, output='search_keyword_in_2020.xlsx', geo='VN'):
+    df = monthly_trends(params_dic, [year], geo)
+
+    #the pivot table of a topic is only built when its sheet is written
+    def sheets():
+        for trend, new_df in df.groupby('trend_type', sort=False):
+            pivot = topic_pivot(new_df)
+            yield trend, pivot.columns, iter_chunks(pivot)
+
+    write_excel_stream(output, sheets())
+    print('{} is successfully exported'.format(output))
+
+
+#the title of a chart of the top n keywords of a geo in a year
+def chart_title(n, year, geo, topic=None):
+    place = 'VIETNAM' if geo == 'VN' else geo
+    if topic is None:
+        return 'TOP {} MOST SEARCHED KEYWORDS IN {} {}'.format(n, place, year)
+    return 'TOP {} MOST SEARCHED KEYWORDS ABOUT {} IN {} {}'.format(n, str(topic).upper(), place, year)
+
+
+#export a line chart (menu option 4) or a bar chart (menu option 5) of the top n most searched keywords in a year
+#as a PNG file. The axes are scaled from the data and an unchanged chart is copied from the chart cache
+def chart_top_keywords(params_dic, year, output, kind='line', n=5, geo='VN', cache_dir='chart_cache'):
+    from gtrends.charts import render_charts
+
+    top_5 = top_keywords(params_dic, [year], n, geo)
+    top_5 = top_5.rename(columns={'total':'value'})
+    spec = {'data': top_5, 'kind': kind, 'title': chart_title(n, year, geo), 'output': output}
+    if render_charts([spec], cache_dir=cache_dir):
+        print('The {} chart of the top {} most searched keywords in {} is successfully graphed'.format(kind, n, year))
+    print('The {} chart is successfully exported as a PNG called file {}'.format(kind, output))
+
+
+#export many charts at once into the folder output: for every geo and year, a chart of the top n keywords and, if
+#by_topic is true, one chart of the top n keywords of every topic, in every kind ('line', 'bar'). The charts are
+#drawn in a pool of max_workers processes and only the charts whose data changed are drawn again
+def chart_batch(params_dic, years, output, kinds=('line', 'bar'), n=5, geos=('VN',), by_topic=True,
+                max_workers=None, cache_dir='chart_cache'):
+    from gtrends.analytics import keyword_summary
+    from gtrends.charts import render_charts
+
+    specs = []
+    for geo in geos:
+        for year in years:
+            charts = [(None, top_keywords(params_dic, [year], n, geo))]
+            if by_topic:
+                df = monthly_trends(params_dic, [year], geo)
+                charts += [(topic, keyword_summary(topic_df, n))
+                           for topic, topic_df in df.groupby('trend_type', sort=False)]
+            for topic, top in charts:
+                if topic is None:
+                    name = 'top{}_{}_{}'.format(n, geo, year)
+                else:
+                    name = 'topic_{}_{}_{}'.format(topic, geo, year)
+                name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)
+                for kind in kinds:
+                    specs.append({'data': top[['keyword', 'total']].rename(columns={'total': 'value'}),
+                                  'kind': kind, 'title': chart_title(n, year, geo, topic),
+                                  'output': os.path.join(output, '{}_{}.png'.format(name, kind))})
+    drawn = render_charts(specs, max_workers, cache_dir)
+    print('{} charts are exported to {} ({} drawn, {} unchanged)'.format(len(specs), output, len(drawn),
+                                                                         len(specs) - len(drawn)))
+
+
+#export the top n most searched keywords of each of the given years side by side, with their total number of
+#searches and the month in which they were searched the most, to an excel file (menu option 6)
+def report_top_by_year(params_dic, years=(2020, 2019), output='top_five_trending_1920.xlsx', n=5, geo='VN'):
+    frames = []
+    for year in years:
+        new_df = top_keywords(params_dic, [year], n, geo)
+        new_df['month'] = new_df['month'].dt.strftime('%m-%y')
+        labels = ['Keyword', 'Total Search Count','Date with the most searches']
+        if not frames:
+            new_df.insert(0,'STT',range(1, len(new_df)+1))
+            labels = ['No.'] + labels
+        new_df.columns = pd.MultiIndex.from_product([['Year {}'.format(year)], labels])
+        print('The top {} most searched keywords in {} is successfully found'.format(n, year))
+        frames.append(new_df)
+
+    final_df = pd.concat(frames,axis=1)
+    final_df.to_excel(output)
+    print('The information of the top {} most searched keywords is successfully exported as an excel file called {}'
+          .format(n, output))
+
+
+#the reports that can be asked for in a job file, by type
+REPORTS = {
+    'top_keywords': report_top_keywords,
+    'by_topic': report_by_topic,
+    'chart': chart_top_keywords,
+    'charts': chart_batch,
+    'top_by_year': report_top_by_year,
+    'export': export_points,
+    'breakouts': report_breakouts,
+}
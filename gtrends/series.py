@@ -0,0 +1,161 @@
+# coding: utf-8
+
+#A compact in-memory store for fetched trends. Google Trends values are integers from 0 to 100, so every point is
+#kept in one byte of a uint8 matrix (dates x series) with one date axis shared by every series, and the keyword and
+#topic of every series are codes into an index of unique keywords and an index of topics. A missing point is 255.
+#to_dbtable turns the trends into the long table that the storage backends load
+
+import numpy as np
+import pandas as pd
+
+MISSING = 255
+
+
+#the trends of many topics as one matrix. Series are added topic by topic with add (the wide dataframes returned by
+#get_trend) and the matrix is built the first time it is read, so adding is cheap. A keyword that is in two topics
+#is two series. frame and matrix give views of the matrix without copying it, to_dict gives back the dictionary of
+#dataframes that dict_trend returns, and to_long the long table that to_dbtable returns
+class SeriesStore:
+    def __init__(self):
+        self.blocks = []
+        self._built = None
+
+    @classmethod
+    def from_dict(cls, dic, dic_key_lst=None):
+        store = cls()
+        for key in (dic_key_lst if dic_key_lst is not None else list(dic)):
+            store.add(key, dic[key])
+        return store
+
+    #add the series of a topic: a dataframe with one column per keyword and the dates as index
+    def add(self, topic, df):
+        if df.empty:
+            return
+        values = np.rint(df.to_numpy(dtype=np.float64)) #rounded first, so 100.00000000000001 is 100
+        missing = np.isnan(values)
+        if ((values[~missing] < 0) | (values[~missing] > 100)).any():
+            raise ValueError('The trends of {} are not between 0 and 100'.format(topic))
+        block = np.where(missing, MISSING, values).astype(np.uint8)
+        self.blocks.append((topic, pd.DatetimeIndex(df.index), list(df.columns), block))
+        self._built = None
+
+    #build the matrix, the shared date axis and the codes of every series from the blocks
+    def build(self):
+        if self._built is not None:
+            return self._built
+        dates = pd.DatetimeIndex([], name='date')
+        for _, index, _, _ in self.blocks:
+            dates = dates.union(index)
+        dates.name = 'date'
+        topics = pd.Index(pd.unique(np.array([topic for topic, _, _, _ in self.blocks], dtype=object)))
+        keywords = pd.Index(pd.unique(np.array([kw for _, _, cols, _ in self.blocks for kw in cols], dtype=object)))
+        matrix = np.full((len(dates), sum(len(cols) for _, _, cols, _ in self.blocks)), MISSING, dtype=np.uint8)
+        keyword_codes = np.empty(matrix.shape[1], dtype=np.int32)
+        topic_codes = np.empty(matrix.shape[1], dtype=np.int32)
+        start = 0
+        #the series of a topic are next to each other, so the frame of a topic is a slice of the matrix
+        for code, topic in enumerate(topics):
+            for block_topic, index, cols, block in self.blocks:
+                if block_topic != topic:
+                    continue
+                end = start + len(cols)
+                matrix[dates.get_indexer(index), start:end] = block
+                keyword_codes[start:end] = keywords.get_indexer(cols)
+                topic_codes[start:end] = code
+                start = end
+        matrix.flags.writeable = False
+        self._built = (matrix, dates, keywords, topics, keyword_codes, topic_codes)
+        return self._built
+
+    @property
+    def matrix(self):
+        return self.build()[0]
+
+    @property
+    def dates(self):
+        return self.build()[1]
+
+    @property
+    def topics(self):
+        return self.build()[3]
+
+    @property
+    def nbytes(self):
+        matrix, dates, _, _, keyword_codes, topic_codes = self.build()
+        return matrix.nbytes + dates.nbytes + keyword_codes.nbytes + topic_codes.nbytes
+
+    #the wide uint8 dataframe of a topic (or of every series), a view of the matrix; missing points are 255
+    def frame(self, topic=None):
+        matrix, dates, keywords, topics, keyword_codes, topic_codes = self.build()
+        if topic is None:
+            start, end = 0, matrix.shape[1]
+        else:
+            columns = np.flatnonzero(topic_codes == topics.get_loc(topic))
+            start, end = columns[0], columns[-1] + 1
+        return pd.DataFrame(matrix[:, start:end], index=dates, columns=keywords[keyword_codes[start:end]],
+                            copy=False)
+
+    #give back the dictionary of float dataframes of every topic, with NaN for missing points
+    def to_dict(self):
+        dic = {}
+        for topic, index, cols, block in self.blocks:
+            values = np.where(block == MISSING, np.nan, block.astype(np.float64))
+            dic[topic] = pd.DataFrame(values, index=index.rename('date'), columns=cols)
+        return dic
+
+    #the long table of to_dbtable (keyword, date, value, trend_type, and geo if it is given) built from the codes,
+    #without the missing points. Only the topics in dic_key_lst are kept if it is given
+    def to_long(self, dic_key_lst=None, geo=None):
+        matrix, dates, keywords, topics, keyword_codes, topic_codes = self.build()
+        columns = np.arange(matrix.shape[1])
+        if dic_key_lst is not None:
+            columns = columns[np.isin(topic_codes, topics.get_indexer(list(dic_key_lst)))]
+        values = matrix[:, columns].ravel(order='F') #column by column
+        keep = values != MISSING
+        df = pd.DataFrame({
+            'keyword': pd.Categorical.from_codes(np.repeat(keyword_codes[columns], len(dates))[keep],
+                                                 categories=keywords),
+            'date': np.tile(dates.to_numpy(dtype='datetime64[ns]'), len(columns))[keep],
+            'value': pd.array(values[keep], dtype='Int64'),
+            'trend_type': pd.Categorical.from_codes(np.repeat(topic_codes[columns], len(dates))[keep],
+                                                    categories=topics),
+        })
+        if geo is not None:
+            df.insert(1, 'geo', pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), categories=[geo]))
+        return df
+
+
+#this is a function that creates a new dataframe that has the columns: "keyword", "date", "value", and "trend_type"
+#and the data for this dataframe is taken from the dictionary containing trends of the keywords. The output arrays
+#are allocated once and every topic is reshaped into its slice (keyword by keyword, date by date), so the time grows
+#linearly with the number of keywords; keyword and trend_type are categorical columns. If the geo of the trends is
+#given, a geo column is added after keyword, so Storage.upsert saves the rows in the partition of that geo. dic can
+#also be a SeriesStore, which builds the table from its codes. It is kept here, away from gtrends.db, so building the
+#table does not import psycopg2
+def to_dbtable(dic, dic_key_lst, geo=None):
+    if isinstance(dic, SeriesStore):
+        return dic.to_long(dic_key_lst, geo)
+    frames = [(key, dic[key]) for key in dic_key_lst if not dic[key].empty]
+    total = sum(df.size for _, df in frames)
+    keywords = pd.Index([col for _, df in frames for col in df.columns]).unique()
+    keyword_codes = np.empty(total, dtype=np.int32)
+    trend_codes = np.empty(total, dtype=np.int32)
+    dates = np.empty(total, dtype='datetime64[ns]')
+    values = np.empty(total, dtype=np.float64)
+    start = 0
+    for code, (key, df) in enumerate(frames):
+        end = start + df.size
+        keyword_codes[start:end] = np.repeat(keywords.get_indexer(df.columns), len(df))
+        trend_codes[start:end] = code
+        dates[start:end] = np.tile(df.index.to_numpy(dtype='datetime64[ns]'), len(df.columns))
+        values[start:end] = df.to_numpy(dtype=np.float64).ravel(order='F') #column by column
+        start = end
+    df = pd.DataFrame({
+        'keyword': pd.Categorical.from_codes(keyword_codes, categories=keywords),
+        'date': dates,
+        'value': pd.Series(values).round().astype('Int64'),
+        'trend_type': pd.Categorical.from_codes(trend_codes, categories=[key for key, _ in frames]),
+    })
+    if geo is not None:
+        df.insert(1, 'geo', pd.Categorical.from_codes(np.zeros(total, dtype=np.int8), categories=[geo]))
+    return df
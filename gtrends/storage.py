@@ -0,0 +1,88 @@
+# coding: utf-8
+
+#The storage backends: where the trends are saved and where the reports read them from. The "database" part of a
+#job (or the connection parameters of the menu) chooses the backend: PostgreSQL by default (gtrends.db), or a
+#local folder of Parquet files queried with DuckDB (gtrends.warehouse) with {"backend": "parquet", "path": ...}.
+#Each backend is only imported when it is used
+
+import threading
+
+
+#what every backend does. The dataframes are the output of to_dbtable (keyword, date, value, trend_type, and geo if
+#it was given one) for upsert,
+#the output of region_trend_concurrent (keyword, geo, region, value, timeframe) for upsert_regions, and the same
+#columns as before for top_keywords (keyword, total, month) and monthly_trends (keyword, date, value, trend_type)
+class Storage:
+    #create the tables or folders if needed
+    def setup(self):
+        raise NotImplementedError
+
+    #return {keyword: date of the latest stored point} for a timeframe and a geo
+    def latest_points(self, timeframe, geo='VN'):
+        raise NotImplementedError
+
+    #insert or update the points of a timeframe, return 1 if it failed. The points of a dataframe with a geo column
+    #go to the partition of their own geo, the points of one without it to the given geo
+    def upsert(self, df, timeframe, geo='VN'):
+        if 'geo' not in df.columns:
+            return self.upsert_geo(df, timeframe, geo)
+        failed = [self.upsert_geo(part, timeframe, part_geo)
+                  for part_geo, part in df.groupby('geo', observed=True, sort=False)]
+        return 1 if 1 in failed else None
+
+    #insert or update the points of one geo for a timeframe, return 1 if it failed
+    def upsert_geo(self, df, timeframe, geo='VN'):
+        raise NotImplementedError
+
+    #insert or update the split of the searches between the sub-regions of each geo, return 1 if it failed
+    def upsert_regions(self, df):
+        raise NotImplementedError
+
+    #the top n most searched keywords in the given years with their total and the month of their peak. A backend
+    #that cannot compute it in its own query engine gets it from its monthly trends
+    def top_keywords(self, years, n=10, geo='VN'):
+        from gtrends.analytics import keyword_summary
+
+        return keyword_summary(self.monthly_trends(years, geo), n).drop(columns='rank')
+
+    #the number of searches of every keyword in every month of the given years
+    def monthly_trends(self, years, geo='VN'):
+        raise NotImplementedError
+
+    #yield the latest points of the given years (keyword, date, value, trend_type) in dataframes of at most
+    #chunk_size rows ordered by keyword and date, without reading all of them at once
+    def iter_points(self, years, geo='VN', chunk_size=50000):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+_storages = {}
+_storages_lock = threading.Lock()
+
+
+#return the backend for these parameters, creating it the first time, so a session opens it only once
+def get_storage(params_dic):
+    params_dic = dict(params_dic)
+    key = tuple(sorted(params_dic.items()))
+    with _storages_lock:
+        if key not in _storages:
+            backend = params_dic.pop('backend', 'postgres')
+            if backend == 'parquet':
+                from gtrends.warehouse import ParquetStorage
+                _storages[key] = ParquetStorage(params_dic.get('path', 'trends_warehouse'))
+            elif backend == 'postgres':
+                from gtrends.db import PostgresStorage
+                _storages[key] = PostgresStorage(params_dic)
+            else:
+                raise ValueError('Unknown storage backend {!r}, choose postgres or parquet'.format(backend))
+        return _storages[key]
+
+
+#close every backend, at the end of the program
+def close_storages():
+    with _storages_lock:
+        for storage in _storages.values():
+            storage.close()
+        _storages.clear()
@@ -0,0 +1,183 @@
+# coding: utf-8
+
+#The local storage backend: the trends are kept in a folder of Parquet files partitioned by geo and year and the
+#reports query them in process with DuckDB, so nothing goes over the network. The folder looks like this:
+#
+#    trends_warehouse/
+#        timeframes.json                           {timeframe: timeframe_id}, like the timeframes table
+#        trend_points/geo=VN/year=2020/data.parquet    keyword, timeframe_id, date, value, trend_type
+#        trend_regions/geo=VN/data.parquet             keyword, region, timeframe_id, value
+#
+#DuckDB reads the geo and year of a file from its path (hive partitioning), so a report on one geo and one year
+#only opens the files of that partition, and the date and keyword filters are pushed down to the Parquet row groups
+
+import json
+import os
+import threading
+import time
+
+import duckdb
+import pandas as pd
+
+from gtrends.metrics import METRICS
+from gtrends.storage import Storage
+
+
+class ParquetStorage(Storage):
+    def __init__(self, path='trends_warehouse'):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def setup(self):
+        os.makedirs(os.path.join(self.path, 'trend_points'), exist_ok=True)
+        os.makedirs(os.path.join(self.path, 'trend_regions'), exist_ok=True)
+        print('Using the Parquet warehouse in {}'.format(os.path.abspath(self.path)))
+
+    #return {timeframe: timeframe_id} of every saved timeframe
+    def timeframes(self):
+        try:
+            with open(os.path.join(self.path, 'timeframes.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    #return the id of a timeframe, adding it to timeframes.json the first time. A later timeframe has a larger id
+    #and its points win over the points of older timeframes for the same date, like trend_points_latest
+    def timeframe_id(self, timeframe):
+        timeframes = self.timeframes()
+        if timeframe not in timeframes:
+            timeframes[timeframe] = len(timeframes) + 1
+            path = os.path.join(self.path, 'timeframes.json')
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(timeframes, f, ensure_ascii=False)
+            os.replace(path + '.tmp', path)
+        return timeframes[timeframe]
+
+    #replace the rows of a partition file that have the same key as a new row and write the file again
+    def merge(self, path, new_df, key):
+        if os.path.exists(path):
+            new_df = pd.concat([pd.read_parquet(path), new_df], ignore_index=True)
+            new_df = new_df.drop_duplicates(key, keep='last')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        new_df.to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+    #run a query with DuckDB and return the result as a dataframe
+    def query(self, sql, params=None):
+        with duckdb.connect() as conn:
+            return conn.execute(sql, params or []).df()
+
+    #the SQL that reads the latest point of every (keyword, date) of one geo and some years, or None if nothing is
+    #saved yet or no year is asked for (year IN () is not valid SQL); the filters on geo and year prune the partitions before the window function runs
+    def latest_sql(self, geo, years):
+        if not years or not os.path.isdir(os.path.join(self.path, 'trend_points', 'geo=' + geo)):
+            return None, []
+        files = os.path.join(self.path, 'trend_points', '*', '*', '*.parquet')
+        sql = """
+            SELECT keyword, date, value, trend_type
+            FROM read_parquet(?, hive_partitioning = true, hive_types = {{'geo': VARCHAR, 'year': INTEGER}})
+            WHERE geo = ? AND year IN ({})
+            QUALIFY row_number() OVER (PARTITION BY keyword, date ORDER BY timeframe_id DESC) = 1
+            """.format(', '.join('?' * len(years)))
+        return sql, [files, geo] + [int(year) for year in years]
+
+    def latest_points(self, timeframe, geo='VN'):
+        folder = os.path.join(self.path, 'trend_points', 'geo=' + geo)
+        timeframes = self.timeframes()
+        if timeframe not in timeframes or not os.path.isdir(folder):
+            return {}
+        df = self.query("""
+            SELECT keyword, max(date) AS date
+            FROM read_parquet(?, hive_partitioning = true, hive_types = {'geo': VARCHAR, 'year': INTEGER})
+            WHERE timeframe_id = ?
+            GROUP BY keyword""", [os.path.join(folder, '*', '*.parquet'), timeframes[timeframe]])
+        return dict(zip(df['keyword'], pd.to_datetime(df['date']).dt.date))
+
+    def upsert_geo(self, df, timeframe, geo='VN'):
+        start = time.perf_counter()
+        try:
+            with self.lock:
+                new_df = df[['keyword', 'date', 'value', 'trend_type']].astype({'keyword': str, 'trend_type': str})
+                #a keyword that is in two topics appears twice, keep one row per date
+                new_df = new_df.drop_duplicates(['keyword', 'date'])
+                new_df.insert(1, 'timeframe_id', self.timeframe_id(timeframe))
+                new_df = new_df.sort_values(['date', 'keyword'])
+                for year, part in new_df.groupby(new_df['date'].dt.year):
+                    path = os.path.join(self.path, 'trend_points', 'geo=' + geo, 'year={}'.format(year),
+                                        'data.parquet')
+                    self.merge(path, part, ['keyword', 'timeframe_id', 'date'])
+        except (OSError, ValueError) as error:
+            print("Error: %s" % error)
+            return 1
+        METRICS.record_load('trend_points', len(df), time.perf_counter() - start)
+        print("upsert() done")
+
+    def upsert_regions(self, df):
+        start = time.perf_counter()
+        try:
+            with self.lock:
+                new_df = df.assign(timeframe_id=df['timeframe'].map(self.timeframe_id))
+                for geo, part in new_df.groupby('geo'):
+                    path = os.path.join(self.path, 'trend_regions', 'geo=' + geo, 'data.parquet')
+                    self.merge(path, part[['keyword', 'region', 'timeframe_id', 'value']],
+                               ['keyword', 'region', 'timeframe_id'])
+        except (OSError, ValueError) as error:
+            print("Error: %s" % error)
+            return 1
+        METRICS.record_load('trend_regions', len(df), time.perf_counter() - start)
+        print("upsert_regions() done")
+
+    #the monthly totals are computed from the latest points, the top n keywords by their total over the years and
+    #the peak month is the earliest month with the largest total, like the PostgreSQL backend
+    def top_keywords(self, years, n=10, geo='VN'):
+        latest, params = self.latest_sql(geo, years)
+        if latest is None:
+            return pd.DataFrame({'keyword': [], 'total': [], 'month': pd.to_datetime([])})
+        df = self.query("""
+            WITH monthly AS (
+                SELECT keyword, date_trunc('month', date)::date AS month, sum(value)::BIGINT AS total
+                FROM ({}) latest
+                GROUP BY keyword, month
+            ), totals AS (
+                SELECT keyword, sum(total)::BIGINT AS total
+                FROM monthly
+                GROUP BY keyword
+                ORDER BY total DESC, keyword
+                LIMIT ?
+            ), peaks AS (
+                SELECT keyword, month
+                FROM monthly
+                WHERE keyword IN (SELECT keyword FROM totals)
+                QUALIFY row_number() OVER (PARTITION BY keyword ORDER BY total DESC, month) = 1
+            )
+            SELECT t.keyword, t.total, p.month
+            FROM totals t JOIN peaks p USING (keyword)
+            ORDER BY t.total DESC, t.keyword""".format(latest), params + [n])
+        df['month'] = pd.to_datetime(df['month'])
+        return df
+
+    def monthly_trends(self, years, geo='VN'):
+        latest, params = self.latest_sql(geo, years)
+        if latest is None:
+            return pd.DataFrame({'keyword': [], 'date': pd.to_datetime([]), 'value': [], 'trend_type': []})
+        df = self.query("""
+            SELECT keyword, date_trunc('month', date)::date AS date, sum(value)::BIGINT AS value,
+                   max(trend_type) AS trend_type
+            FROM ({}) latest
+            GROUP BY 1, 2
+            ORDER BY trend_type, keyword, date""".format(latest), params)
+        df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    #DuckDB hands the result over in Arrow record batches of chunk_size rows while it is still reading the files
+    def iter_points(self, years, geo='VN', chunk_size=50000):
+        latest, params = self.latest_sql(geo, years)
+        if latest is None:
+            return
+        with duckdb.connect() as conn:
+            reader = conn.execute("SELECT * FROM ({}) latest ORDER BY keyword, date".format(latest),
+                                  params).fetch_record_batch(chunk_size)
+            for batch in reader:
+                df = batch.to_pandas(date_as_object=False)
+                df['date'] = df['date'].astype('datetime64[ns]')
+                yield df